@@ -479,7 +479,8 @@ Svara på svenska, var professionell och trevlig. Om du inte vet svaret, säg at
                     "customer_name": session.memory.get("customer_name", {}).get("value"),
                     "customer_email": session.memory.get("customer_email", {}).get("value"),
                     "message_count": len(session.messages),
-                    "messages": session.messages
+                    "messages": session.messages,
+                    "first_user_message": session.first_user_message
                 },
                 escalation_reason
             )
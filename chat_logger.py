@@ -5,6 +5,7 @@ Log conversations to file, send email transcripts, and sync to Google Sheets
 """
 
 import os
+import sys
 import json
 import csv
 from datetime import datetime
@@ -16,6 +17,19 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.utils import formataddr
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _dumps(data: Any, pretty: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes (compact unless pretty is set)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    return json.dumps(data, ensure_ascii=False, indent=2 if pretty else None).encode("utf-8")
+
 
 @dataclass
 class ChatMessage:
@@ -27,6 +41,19 @@ class ChatMessage:
     urgency: Optional[str] = None
     lead_score: Optional[int] = None
 
+    def __post_init__(self):
+        # Share one str object per distinct role/intent/urgency value
+        self.role = sys.intern(self.role)
+        if self.intent is not None:
+            self.intent = sys.intern(self.intent)
+        if self.urgency is not None:
+            self.urgency = sys.intern(self.urgency)
+
+
+# Metadata values that mark a conversation as escalated
+ESCALATED_URGENCIES = frozenset({"high", "critical"})
+ESCALATED_INTENTS = frozenset({"emergency_critical", "lockout_emergency", "fault_report"})
+
 
 @dataclass
 class ConversationLog:
@@ -79,9 +106,13 @@ class ConversationLog:
 class ChatLogger:
     """
     Log conversations to file system and prepare for export
+
+    Session files are written compactly; pass pretty=True to indent them
+    for manual inspection while debugging.
     """
-    def __init__(self, log_dir: str = "chat_logs"):
+    def __init__(self, log_dir: str = "chat_logs", pretty: bool = False):
         self.log_dir = Path(log_dir)
+        self.pretty = pretty
         self.log_dir.mkdir(exist_ok=True)
 
         # Subdirectories
@@ -115,13 +146,13 @@ class ChatLogger:
         conv.add_message(role, content, **metadata)
 
         # Update metadata
-        if "urgency" in metadata and metadata["urgency"] in ["high", "critical"]:
+        if "urgency" in metadata and metadata["urgency"] in ESCALATED_URGENCIES:
             conv.escalated = True
         if "fault_report" in metadata:
             conv.fault_report = metadata["fault_report"]
         if "intent" in metadata:
             # Track fault report intent
-            if metadata["intent"] in ["emergency_critical", "lockout_emergency", "fault_report"]:
+            if metadata["intent"] in ESCALATED_INTENTS:
                 conv.escalated = True
 
     def end_conversation(self, session_id: str, status: str = "resolved"):
@@ -143,16 +174,20 @@ class ChatLogger:
 
     def _save_conversation(self, conv: ConversationLog):
         """Save conversation to multiple formats"""
-        # JSON format - full session
+        data = conv.to_dict()
+
+        # JSON format - full session, written to a temp file and renamed so a
+        # crash mid-write never leaves a truncated session file behind
         json_path = self.sessions_dir / f"{conv.session_id}.json"
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(conv.to_dict(), f, ensure_ascii=False, indent=2)
+        tmp_path = json_path.with_suffix(".json.tmp")
+        tmp_path.write_bytes(_dumps(data, pretty=self.pretty))
+        os.replace(tmp_path, json_path)
 
         # Daily log (append)
         date_str = datetime.now().strftime("%Y-%m-%d")
         daily_path = self.daily_dir / f"{date_str}.jsonl"
-        with open(daily_path, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(conv.to_dict(), ensure_ascii=False) + "\n")
+        with open(daily_path, 'ab') as f:
+            f.write(_dumps(data) + b"\n")
 
     def get_conversation(self, session_id: str) -> Optional[ConversationLog]:
         """Get conversation from memory or load from disk"""
@@ -162,30 +197,58 @@ class ChatLogger:
         # Try loading from disk
         json_path = self.sessions_dir / f"{session_id}.json"
         if json_path.exists():
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            conv = ConversationLog(
-                session_id=data["session_id"],
-                customer_name=data.get("customer_name"),
-                customer_email=data.get("customer_email"),
-                customer_phone=data.get("customer_phone"),
-                started_at=data.get("started_at"),
-                ended_at=data.get("ended_at"),
-                status=data.get("status", "resolved")
-            )
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except ValueError:
+                # Unreadable session file - fall back to the daily log
+                data = self._load_from_daily(session_id)
+                if data is None:
+                    return None
 
-            for msg_data in data.get("messages", []):
-                msg = ChatMessage(**msg_data)
-                conv.messages.append(msg)
+            return self._conversation_from_dict(data)
 
-            conv.escalated = data.get("escalated", False)
-            conv.fault_report = data.get("fault_report")
-
-            return conv
+        return None
 
+    def _load_from_daily(self, session_id: str) -> Optional[Dict]:
+        """Find the latest daily log entry for a session"""
+        for daily_path in sorted(self.daily_dir.glob("*.jsonl"), reverse=True):
+            found = None
+            with open(daily_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if session_id not in line:
+                        continue
+                    try:
+                        data = json.loads(line)
+                    except ValueError:
+                        continue
+                    if data.get("session_id") == session_id:
+                        found = data
+            if found is not None:
+                return found
         return None
 
+    def _conversation_from_dict(self, data: Dict) -> ConversationLog:
+        """Rebuild a ConversationLog from its stored dictionary form"""
+        conv = ConversationLog(
+            session_id=data["session_id"],
+            customer_name=data.get("customer_name"),
+            customer_email=data.get("customer_email"),
+            customer_phone=data.get("customer_phone"),
+            started_at=data.get("started_at"),
+            ended_at=data.get("ended_at"),
+            status=data.get("status", "resolved")
+        )
+
+        for msg_data in data.get("messages", []):
+            msg = ChatMessage(**msg_data)
+            conv.messages.append(msg)
+
+        conv.escalated = data.get("escalated", False)
+        conv.fault_report = data.get("fault_report")
+
+        return conv
+
     def get_conversations_for_export(self, date: Optional[str] = None) -> List[Dict]:
         """Get conversations for export to email/Google Sheets"""
         if date:
@@ -5,11 +5,17 @@ Streamlit dashboard for analytics and monitoring
 """
 
 import streamlit as st
-import pandas as pd
+import numpy as np
 import json
 from datetime import datetime, timedelta
 import os
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Page config
 st.set_page_config(
     page_title="Support Starter AI - Dashboard",
@@ -19,7 +25,9 @@ st.set_page_config(
 )
 
 # Custom CSS
-st.markdown("""
+# Emitted on every run: Streamlit drops any element a rerun does not emit,
+# so gating this behind a cache or session flag would unstyle the page
+CUSTOM_CSS = """
 <style>
     .metric-card {
         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
@@ -34,33 +42,126 @@ st.markdown("""
         border-left: 4px solid #667eea;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
+
+# Rows per page on the list views
+PAGE_SIZE = 50
+
+# Lead fields shown in the Leads table
+LEAD_COLUMNS = ["lead_score", "name", "email", "phone", "company", "lead_stage"]
+
 
+def to_export_json(data) -> bytes:
+    """Serialize export data to indented UTF-8 JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2, default=str)
+    return json.dumps(data, indent=2, default=str).encode("utf-8")
 
-# Initialize session state
-if "db" not in st.session_state:
+
+@st.cache_resource
+def get_db():
+    """Shared database handle, created once per server process"""
     from persistent_memory import get_persistent_memory
-    st.session_state.db = get_persistent_memory()
+    return get_persistent_memory()
 
 
+@st.cache_data(ttl=30, show_spinner=False)
 def load_metrics():
     """Load metrics from database"""
-    return st.session_state.db.get_metrics(days=30)
+    return get_db().get_metrics(days=30)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_recent_conversations(page=1, since=None, search=None, min_messages=0):
+    """Load one page of recent conversations"""
+    return get_db().get_recent_conversations(
+        limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE,
+        since=since, search=search, min_messages=min_messages
+    )
 
 
-def load_recent_conversations():
-    """Load recent conversations"""
-    return st.session_state.db.get_recent_conversations(limit=50)
+@st.cache_data(ttl=30, show_spinner=False)
+def load_recent_escalations(page=1, priorities=None):
+    """Load one page of recent escalations"""
+    return get_db().get_recent_escalations(
+        limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE,
+        priorities=list(priorities) if priorities is not None else None
+    )
 
 
-def load_recent_escalations():
-    """Load recent escalations"""
-    return st.session_state.db.get_recent_escalations(limit=50)
+@st.cache_data(ttl=30, show_spinner=False)
+def load_recent_leads(page=1, min_score=None):
+    """Load one page of recent leads"""
+    return get_db().get_recent_leads(
+        limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE, min_score=min_score
+    )
 
 
-def load_recent_leads():
-    """Load recent leads"""
-    return st.session_state.db.get_recent_leads(limit=50)
+@st.cache_data(ttl=60, show_spinner=False)
+def load_escalation_stats():
+    """Aggregate escalation stats for the past 30 days"""
+    from escalation import EscalationStore
+    store = EscalationStore.from_records(get_db().get_escalation_rows(days=30))
+    return store.counts_by_priority(), store.mean_lead_score()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_session_count():
+    """Load total number of stored sessions"""
+    return get_db().conn.execute(
+        "SELECT COUNT(*) as count FROM conversations"
+    ).fetchone()["count"]
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_recent_messages(session_ids):
+    """Load the last 5 messages for each listed session in one query"""
+    return get_db().get_messages_for_sessions(list(session_ids), tail=5)
+
+
+@st.fragment
+def render_conversation(conv, messages):
+    """Render one conversation; interactions inside only rerun this fragment"""
+    with st.expander(f"Session: {conv['session_id']} - {conv.get('name', 'Unknown')}"):
+        col1, col2, col3 = st.columns(3)
+        col1.write(f"**Created:** {conv['created_at']}")
+        col2.write(f"**Last Update:** {conv['last_updated']}")
+        col3.write(f"**Email:** {conv.get('email', 'N/A')}")
+
+        if messages:
+            st.write("**Messages:**")
+            for msg in messages:
+                role = msg.get('role', 'unknown').upper()
+                content = msg.get('content', '')
+                if role == 'USER':
+                    st.chat_message("user").write(content)
+                else:
+                    st.chat_message("assistant").write(content)
+
+
+@st.fragment
+def render_escalation(esc):
+    """Render one escalation; Mark Resolved only reruns this fragment"""
+    to_resolve = st.session_state.setdefault("to_resolve", set())
+
+    with st.expander(f"{esc['priority'].upper()}: {esc['escalation_id']}"):
+        col1, col2, col3 = st.columns(3)
+        col1.write(f"**Reason:** {esc['reason']}")
+        col2.write(f"**Sentiment:** {esc['sentiment']}")
+        col3.write(f"**Lead Score:** {esc['lead_score']}")
+
+        st.write(f"**Summary:** {esc['summary']}")
+        st.write(f"**Issue:** {esc['customer_issue']}")
+
+        if esc['resolved']:
+            st.caption("Resolved")
+        elif esc['id'] in to_resolve:
+            st.caption("Pending resolution")
+        elif st.button(f"Mark Resolved", key=f"resolve_{esc['id']}"):
+            to_resolve.add(esc['id'])
+            st.rerun(scope="fragment")
 
 
 # Sidebar
@@ -81,6 +182,7 @@ with st.sidebar:
     st.caption(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
 
     if st.button("Refresh Data", use_container_width=True):
+        st.cache_data.clear()
         st.rerun()
 
 
@@ -109,7 +211,11 @@ if page == "Dashboard":
         )
 
     with col3:
-        high_leads = sum(1 for score, count in metrics["leads_by_score"].items() if int(score) >= 4)
+        leads_by_score = metrics["leads_by_score"]
+        scores = np.fromiter((int(score or 0) for score in leads_by_score.keys()),
+                             dtype=np.int8, count=len(leads_by_score))
+        counts = np.fromiter(leads_by_score.values(), dtype=np.int32, count=len(leads_by_score))
+        high_leads = int(counts[scores >= 4].sum())
         st.metric(
             "Hot Leads",
             high_leads,
@@ -132,16 +238,14 @@ if page == "Dashboard":
     with col1:
         st.subheader("Top Intents")
         if metrics["top_intents"]:
-            intent_df = pd.DataFrame(metrics["top_intents"])
-            st.bar_chart(intent_df.set_index("intent")["count"])
+            st.bar_chart(metrics["top_intents"], x="intent", y="count")
         else:
             st.info("No intent data yet")
 
     with col2:
         st.subheader("Sentiment Distribution")
         if metrics["sentiment_distribution"]:
-            sentiment_df = pd.DataFrame(metrics["sentiment_distribution"])
-            st.bar_chart(sentiment_df.set_index("sentiment")["count"])
+            st.bar_chart(metrics["sentiment_distribution"], x="sentiment", y="count")
         else:
             st.info("No sentiment data yet")
 
@@ -150,10 +254,11 @@ if page == "Dashboard":
     # Lead Score Distribution
     st.subheader("Lead Score Distribution")
     if metrics["leads_by_score"]:
-        score_labels = {k: f"Score {k}" for k in metrics["leads_by_score"].keys()}
-        score_data = {"Score": list(score_labels.values()), "Count": list(metrics["leads_by_score"].values())}
-        score_df = pd.DataFrame(score_data)
-        st.bar_chart(score_df.set_index("Score")["Count"])
+        score_rows = [
+            {"Score": f"Score {score}", "Count": count}
+            for score, count in metrics["leads_by_score"].items()
+        ]
+        st.bar_chart(score_rows, x="Score", y="Count")
     else:
         st.info("No lead data yet")
 
@@ -162,117 +267,127 @@ if page == "Dashboard":
 elif page == "Conversations":
     st.title("Recent Conversations")
 
-    conversations = load_recent_conversations()
+    # Filters are applied in the database query
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        search = st.text_input("Search", placeholder="Session ID or name...")
+    with col2:
+        date_filter = st.date_input("From date", value=datetime.now() - timedelta(days=7))
+    with col3:
+        min_sessions = st.number_input("Min messages", min_value=1, value=1)
+    with col4:
+        page_num = st.number_input("Page", min_value=1, value=1, key="conversations_page")
+
+    conversations = load_recent_conversations(
+        page=page_num,
+        since=date_filter.isoformat(),
+        search=search or None,
+        min_messages=min_sessions
+    )
 
     if conversations:
-        # Filters
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            search = st.text_input("Search", placeholder="Session ID or name...")
-        with col2:
-            date_filter = st.date_input("From date", value=datetime.now() - timedelta(days=7))
-        with col3:
-            min_sessions = st.number_input("Min messages", min_value=1, value=1)
-
         # Display conversations
+        messages_by_session = load_recent_messages(
+            tuple(conv['session_id'] for conv in conversations)
+        )
         for conv in conversations:
-            with st.expander(f"Session: {conv['session_id']} - {conv.get('name', 'Unknown')}"):
-                col1, col2, col3 = st.columns(3)
-                col1.write(f"**Created:** {conv['created_at']}")
-                col2.write(f"**Last Update:** {conv['last_updated']}")
-                col3.write(f"**Email:** {conv.get('email', 'N/A')}")
-
-                # Load messages
-                messages = st.session_state.db.get_session_messages(conv['session_id'])
-                if messages:
-                    st.write("**Messages:**")
-                    for msg in messages[-5:]:  # Show last 5
-                        role = msg.get('role', 'unknown').upper()
-                        content = msg.get('content', '')
-                        if role == 'USER':
-                            st.chat_message("user").write(content)
-                        else:
-                            st.chat_message("assistant").write(content)
+            render_conversation(conv, messages_by_session.get(conv['session_id'], []))
     else:
-        st.info("No conversations yet")
+        st.info("No conversations found")
 
 
 # Escalations Page
 elif page == "Escalations":
     st.title("Escalations")
 
-    escalations = load_recent_escalations()
-
-    if escalations:
-        # Priority filter
+    # Resolutions are queued and written in one transaction
+    to_resolve = st.session_state.setdefault("to_resolve", set())
+    if st.button("Apply Resolutions", type="primary"):
+        if to_resolve:
+            get_db().resolve_escalations(sorted(to_resolve))
+            to_resolve.clear()
+            load_recent_escalations.clear()
+            st.rerun()
+
+    # Last 30 days overview
+    priority_counts, mean_lead_score = load_escalation_stats()
+    priorities = [p for p in ("critical", "high", "medium", "low", "unknown") if p in priority_counts]
+    stat_cols = st.columns(len(priorities) + 1)
+    for stat_col, priority in zip(stat_cols, priorities):
+        stat_col.metric(priority.capitalize(), priority_counts[priority])
+    stat_cols[-1].metric("Avg Lead Score", f"{mean_lead_score:.1f}")
+
+    # Priority filter
+    col1, col2 = st.columns([3, 1])
+    with col1:
         priority_filter = st.multiselect(
             "Filter by Priority",
             ["critical", "high", "medium", "low"],
             default=["critical", "high", "medium", "low"]
         )
+    with col2:
+        page_num = st.number_input("Page", min_value=1, value=1, key="escalations_page")
+
+    escalations = load_recent_escalations(page=page_num, priorities=tuple(priority_filter))
 
+    if escalations:
         for esc in escalations:
-            if esc["priority"] in priority_filter:
-                # Color code by priority
-                color = {
-                    "critical": "red",
-                    "high": "orange",
-                    "medium": "yellow",
-                    "low": "green"
-                }.get(esc["priority"], "gray")
-
-                with st.expander(f"{esc['priority'].upper()}: {esc['escalation_id']}"):
-                    col1, col2, col3 = st.columns(3)
-                    col1.write(f"**Reason:** {esc['reason']}")
-                    col2.write(f"**Sentiment:** {esc['sentiment']}")
-                    col3.write(f"**Lead Score:** {esc['lead_score']}")
-
-                    st.write(f"**Summary:** {esc['summary']}")
-                    st.write(f"**Issue:** {esc['customer_issue']}")
-
-                    if st.button(f"Mark Resolved", key=f"resolve_{esc['id']}"):
-                        st.session_state.db.conn.execute(
-                            "UPDATE escalations SET resolved=1 WHERE id=?",
-                            (esc['id'],)
-                        )
-                        st.session_state.db.conn.commit()
-                        st.rerun()
+            render_escalation(esc)
     else:
-        st.info("No escalations yet")
+        st.info("No escalations found")
 
 
 # Leads Page
 elif page == "Leads":
     st.title("Leads")
 
-    leads = load_recent_leads()
+    # Score filter
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        min_score = st.slider("Minimum Lead Score", 1, 5, 3)
+    with col2:
+        page_num = st.number_input("Page", min_value=1, value=1, key="leads_page")
+
+    leads = load_recent_leads(page=page_num, min_score=min_score)
 
     if leads:
-        # Score filter
-        min_score = st.slider("Minimum Lead Score", 1, 5, 3)
+        # One grid for the list; details only for the selected row
+        event = st.dataframe(
+            [{column: lead.get(column) for column in LEAD_COLUMNS} for lead in leads],
+            column_config={
+                "lead_score": st.column_config.NumberColumn("Score", format="%d/5"),
+                "name": "Name",
+                "email": "Email",
+                "phone": "Phone",
+                "company": "Company",
+                "lead_stage": "Stage"
+            },
+            hide_index=True,
+            use_container_width=True,
+            selection_mode="single-row",
+            on_select="rerun",
+            key="leads_table"
+        )
 
-        for lead in leads:
-            if lead["lead_score"] >= min_score:
-                with st.expander(f"Score {lead['lead_score']}/5 - {lead.get('name', 'Unknown')}"):
-                    col1, col2, col3, col4 = st.columns(4)
-                    col1.write(f"**Email:** {lead.get('email', 'N/A')}")
-                    col2.write(f"**Phone:** {lead.get('phone', 'N/A')}")
-                    col3.write(f"**Company:** {lead.get('company', 'N/A')}")
-                    col4.write(f"**Stage:** {lead['lead_stage']}")
-
-                    signals = json.loads(lead.get('triggered_signals', '[]'))
-                    if signals:
-                        st.write("**Buying Signals:**")
-                        for signal in signals:
-                            st.caption(f"- {signal}")
-
-                    services = json.loads(lead.get('interested_services', '[]'))
-                    if services:
-                        st.write("**Interested In:**")
-                        for service in services:
-                            st.caption(f"- {service}")
+        if event.selection.rows:
+            lead = leads[event.selection.rows[0]]
+            st.subheader(f"Score {lead['lead_score']}/5 - {lead.get('name') or 'Unknown'}")
+
+            signals = lead['triggered_signals']
+            if signals:
+                st.write("**Buying Signals:**")
+                for signal in signals:
+                    st.caption(f"- {signal}")
+
+            services = lead['interested_services']
+            if services:
+                st.write("**Interested In:**")
+                for service in services:
+                    st.caption(f"- {service}")
+        else:
+            st.caption("Select a lead to see buying signals and interests")
     else:
-        st.info("No leads yet")
+        st.info("No leads found")
 
 
 # Settings Page
@@ -300,13 +415,10 @@ elif page == "Settings":
     with col2:
         st.subheader("Database")
 
-        db_info = st.session_state.db.conn.execute(
-            "SELECT COUNT(*) as count FROM conversations"
-        ).fetchone()
-
-        st.metric("Total Sessions", db_info["count"])
+        db = get_db()
+        st.metric("Total Sessions", load_session_count())
 
-        db_size = os.path.getsize(st.session_state.db.db_path) if hasattr(st.session_state.db, 'db_path') else 0
+        db_size = os.path.getsize(db.db_path) if hasattr(db, 'db_path') else 0
         st.metric("Database Size", f"{db_size / 1024:.1f} KB")
 
         st.divider()
@@ -314,7 +426,10 @@ elif page == "Settings":
         st.subheader("Actions")
 
         if st.button("Clean Old Sessions (30+ days)"):
-            deleted = st.session_state.db.cleanup_old_sessions(days=30)
+            deleted = db.cleanup_old_sessions(days=30)
+            load_recent_conversations.clear()
+            load_session_count.clear()
+            load_metrics.clear()
             st.success(f"Deleted {deleted} old sessions")
 
     st.divider()
@@ -327,7 +442,7 @@ elif page == "Settings":
             convs = load_recent_conversations()
             st.download_button(
                 "Download JSON",
-                json.dumps(convs, indent=2, default=str),
+                to_export_json(convs),
                 "conversations.json",
                 "application/json"
             )
@@ -337,7 +452,7 @@ elif page == "Settings":
             escalations = load_recent_escalations()
             st.download_button(
                 "Download JSON",
-                json.dumps(escalations, indent=2, default=str),
+                to_export_json(escalations),
                 "escalations.json",
                 "application/json"
             )
@@ -347,7 +462,7 @@ elif page == "Settings":
             leads = load_recent_leads()
             st.download_button(
                 "Download JSON",
-                json.dumps(leads, indent=2, default=str),
+                to_export_json(leads),
                 "leads.json",
                 "application/json"
             )
@@ -2,14 +2,48 @@
 SUPPORT STARTER AI - SMART ESCALATION SYSTEM
 =============================================
 Intelligent escalation with full context for human agents
+
+Performance notes:
+- should_escalate runs on every inbound message and is compute-bound on
+  short strings: lowercase once, then plain substring checks and cheap
+  comparisons (faster here than a combined regex).
+- Packet creation and to_json run once per escalation and are bound by
+  Python object traversal: avoid copies (asdict, list rebuilds) and let
+  orjson do the encoding.
+Run this module directly to time both paths.
 """
 
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, asdict
-from datetime import datetime
+from typing import Dict, List, Any, Optional, Mapping, Tuple
+from types import MappingProxyType
+from dataclasses import dataclass, fields
+from array import array
+from collections import Counter
+from datetime import datetime, timezone
 from enum import Enum
+import functools
+import itertools
 import json
 import os
+import time
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# Keyword trigger groups checked by EscalationEngine
+KEYWORD_GROUPS = ("legal", "manager", "billing", "contract")
+
+# Sentiments that turn a refund request into a dispute
+REFUND_DISPUTE_SENTIMENTS = frozenset({"frustrated", "angry"})
 
 
 class EscalationPriority(Enum):
@@ -33,10 +67,124 @@ class EscalationReason(Enum):
     UNKNOWN = "unknown"
 
 
-@dataclass
+# Default escalation rules, built once at import and shared read-only
+ESCALATION_RULES: Mapping[EscalationReason, Mapping[str, Any]] = MappingProxyType({
+    EscalationReason.LEGAL_THREAT: MappingProxyType({
+        "priority": EscalationPriority.CRITICAL,
+        "auto_escalate": True,
+        "notify": ("legal", "management"),
+        "response_template": "Jag kopplar dig direkt till vår jurist."
+    }),
+    EscalationReason.ANGRY_CUSTOMER: MappingProxyType({
+        "priority": EscalationPriority.HIGH,
+        "auto_escalate": True,
+        "notify": ("support_lead",),
+        "response_template": "Jag förstår att du är frustrerad. Låt mig koppla dig till en chef som kan hjälpa dig direkt."
+    }),
+    EscalationReason.TECHNICAL_ISSUE: MappingProxyType({
+        "priority": EscalationPriority.MEDIUM,
+        "auto_escalate": False,  # Try to solve first
+        "notify": ("technical",),
+        "response_template": "Detta verkar vara ett tekniskt problem. Jag eskalerar detta till vårt tekniska team."
+    }),
+    EscalationReason.REFUND_DISPUTE: MappingProxyType({
+        "priority": EscalationPriority.HIGH,
+        "auto_escalate": True,
+        "notify": ("billing", "support"),
+        "response_template": "Jag förstår angående din återbetalning. Låt mig koppla dig till vår avdelning som hanterar detta."
+    }),
+    EscalationReason.MANAGER_REQUEST: MappingProxyType({
+        "priority": EscalationPriority.HIGH,
+        "auto_escalate": True,
+        "notify": ("support_lead",),
+        "response_template": "Självklart, jag kopplar dig till en chef."
+    }),
+    EscalationReason.COMPLEX_CASE: MappingProxyType({
+        "priority": EscalationPriority.MEDIUM,
+        "auto_escalate": False,
+        "notify": ("support",),
+        "response_template": "Detta är en lite mer komplex fråga. Låt mig koppla dig till rätt person."
+    }),
+    EscalationReason.BILLING_ERROR: MappingProxyType({
+        "priority": EscalationPriority.HIGH,
+        "auto_escalate": True,
+        "notify": ("billing",),
+        "response_template": "Jag ser att det är ett problem med din betalning. Jag eskalerar detta direkt."
+    }),
+    EscalationReason.CONTRACTUAL: MappingProxyType({
+        "priority": EscalationPriority.HIGH,
+        "auto_escalate": True,
+        "notify": ("legal", "sales"),
+        "response_template": "När det gäller avtal och kontrakt kopplar jag dig till rätt person."
+    })
+})
+
+# Summary templates per reason, formatted with turns/sentiment at escalation time
+SUMMARY_TEMPLATES: Mapping[EscalationReason, str] = MappingProxyType({
+    EscalationReason.LEGAL_THREAT: "Kunden har nämnt legala åtgärder. Detta kräver omedelbar hantering av jurist.",
+    EscalationReason.ANGRY_CUSTOMER: "Kunden är mycket frustrerad/arg ({sentiment}). Har samtalat i {turns} rundor utan lösning.",
+    EscalationReason.TECHNICAL_ISSUE: "Tekniskt problem som inte kunnat lösas efter {turns} försök.",
+    EscalationReason.REFUND_DISPUTE: "Kunden vill ha återbetalning och är {sentiment}. Kräver manuell hantering.",
+    EscalationReason.MANAGER_REQUEST: "Kunden har specifikt begärt att prata med en chef.",
+    EscalationReason.COMPLEX_CASE: "Komplext ärende som kräver {turns}+ samtal och mänsklig bedömning.",
+    EscalationReason.BILLING_ERROR: "Fel i betalningssystemet som kräver omedelbar åtgärd.",
+    EscalationReason.CONTRACTUAL: "Frågor rörande avtal/kontrakt som kräver juridisk kompetens."
+})
+
+# Summary for reasons without a dedicated template
+FALLBACK_SUMMARY_TEMPLATE = "Eskalering efter {turns} samtal. Intent: {intent}, Sentiment: {sentiment}"
+
+# First suggested action for every escalation
+BASE_SUGGESTED_ACTION = "Läs igenom konversationen för kontext"
+
+# Reason-specific suggested actions for the human agent
+SUGGESTED_ACTIONS: Mapping[EscalationReason, tuple] = MappingProxyType({
+    EscalationReason.ANGRY_CUSTOMER: (
+        "Bekräfta kundens känslor",
+        "Erbjud kompensation/lösning snabbt",
+        "Följ upp personligen inom 24h"
+    ),
+    EscalationReason.TECHNICAL_ISSUE: (
+        "Samla in felmeddelanden/loggar",
+        "Kontakta tekniska teamet",
+        "Ge kunden tidsuppskattning"
+    ),
+    EscalationReason.REFUND_DISPUTE: (
+        "Verifiera köp och betalningsstatus",
+        "Kontrollera refund policy",
+        "Gör bedömning baserat på policy"
+    ),
+    EscalationReason.LEGAL_THREAT: (
+        "Omedelbar kontakt med juridik",
+        "Dokumentera allting noga",
+        "Svara ej innan konsulterat jurist"
+    )
+})
+
+
+@functools.lru_cache(maxsize=1)
+def _default_triggers() -> Mapping[str, Any]:
+    """Escalation triggers from environment variables, with built-in defaults"""
+    return MappingProxyType({
+        "max_conversation_turns": int(os.getenv("ESCALATION_MAX_TURNS", "8")),
+        "min_lead_score_for_escalation": int(os.getenv("ESCALATION_MIN_LEAD_SCORE", "4")),
+        "sentiment_escalation": tuple(os.getenv("ESCALATION_SENTIMENT", "angry,frustrated").split(",")),
+        "keyword_triggers": MappingProxyType({
+            "legal": tuple(os.getenv("ESCALATION_LEGAL_KEYWORDS", "lagar,advokat,konsumentverket,polisen,stämma").split(",")),
+            "manager": tuple(os.getenv("ESCALATION_MANAGER_KEYWORDS", "chef,manager,ledning,överordnad").split(",")),
+            "billing": tuple(os.getenv("ESCALATION_BILLING_KEYWORDS", "faktureringsfel,felaktig betalning,dragen pengar").split(",")),
+            "contract": tuple(os.getenv("ESCALATION_CONTRACT_KEYWORDS", "avtal,kontrakt,bindande").split(",")),
+        })
+    })
+
+
+@dataclass(slots=True, frozen=True)
 class EscalationContext:
     """
     Full context package for human agents
+
+    Packets are immutable and hashable, so identical packets deduplicate
+    in sets.
     """
     # Basic info
     escalation_id: str
@@ -64,38 +212,134 @@ class EscalationContext:
     # Conversation context
     conversation_turns: int = 0
     duration_seconds: Optional[int] = None
-    messages_summary: List[str] = None
+    messages_summary: Tuple[str, ...] = ()
 
     # Additional context
-    buying_signals: List[str] = None
-    objections: List[str] = None
-    attempted_solutions: List[str] = None
+    buying_signals: Tuple[str, ...] = ()
+    objections: Tuple[str, ...] = ()
+    attempted_solutions: Tuple[str, ...] = ()
 
     # Suggested actions for human agent
-    suggested_actions: List[str] = None
+    suggested_actions: Tuple[str, ...] = ()
 
     def __post_init__(self):
-        if self.messages_summary is None:
-            self.messages_summary = []
-        if self.buying_signals is None:
-            self.buying_signals = []
-        if self.objections is None:
-            self.objections = []
-        if self.attempted_solutions is None:
-            self.attempted_solutions = []
-        if self.suggested_actions is None:
-            self.suggested_actions = []
+        # Accept lists (or None) from callers and store them as tuples
+        for name in _CONTEXT_LIST_FIELDS:
+            value = getattr(self, name)
+            if not isinstance(value, tuple):
+                object.__setattr__(self, name, tuple(value or ()))
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization"""
-        data = asdict(self)
+        data = {name: getattr(self, name) for name in _CONTEXT_FIELDS}
         data["priority"] = self.priority.value
         data["reason"] = self.reason.value
         return data
 
-    def to_json(self) -> str:
+    def to_json_bytes(self, pretty: bool = False) -> bytes:
+        """Convert to UTF-8 encoded JSON (compact unless pretty, e.g. for logs)"""
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2 if pretty else 0)
+        return json.dumps(self.to_dict(), ensure_ascii=False,
+                          indent=2 if pretty else None).encode("utf-8")
+
+    def to_json(self, pretty: bool = False) -> str:
         """Convert to JSON string"""
-        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        return self.to_json_bytes(pretty).decode("utf-8")
+
+
+# Field names of EscalationContext, in declaration order
+_CONTEXT_FIELDS = tuple(field.name for field in fields(EscalationContext))
+
+# Fields holding sequences of strings
+_CONTEXT_LIST_FIELDS = ("messages_summary", "buying_signals", "objections",
+                        "attempted_solutions", "suggested_actions")
+
+
+class EscalationStore:
+    """
+    Column-oriented store of escalations for aggregate analytics
+
+    Numeric fields live in typed arrays (one contiguous buffer per column),
+    so reductions like counts per priority scan a single column instead of
+    walking every escalation object. NumPy is used for the reductions when
+    installed; otherwise the same results come from the stdlib.
+    """
+    # Priority column codes, in EscalationPriority declaration order
+    PRIORITY_CODES = {priority.value: code for code, priority in enumerate(EscalationPriority)}
+    # Bucket for rows with a missing or unrecognised priority
+    UNKNOWN_PRIORITY = "unknown"
+    UNKNOWN_PRIORITY_CODE = len(PRIORITY_CODES)
+
+    def __init__(self):
+        self.priority = array("b")
+        self.lead_score = array("b")
+        self.sentiment_code = array("h")
+        self.sentiments: List[str] = []  # code -> sentiment label
+
+        self._sentiment_codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.priority)
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "EscalationStore":
+        """Build a store from saved escalation rows"""
+        store = cls()
+        for record in records:
+            store.add_record(record)
+        return store
+
+    def add(self, escalation: EscalationContext) -> None:
+        """Append an escalation packet"""
+        self.add_record({
+            "priority": escalation.priority.value,
+            "sentiment": escalation.customer_sentiment,
+            "lead_score": escalation.lead_score
+        })
+
+    def add_record(self, record: Dict[str, Any]) -> None:
+        """Append an escalation in its stored (dict) form"""
+        sentiment = record.get("sentiment") or "unknown"
+        code = self._sentiment_codes.get(sentiment)
+        if code is None:
+            code = self._sentiment_codes[sentiment] = len(self.sentiments)
+            self.sentiments.append(sentiment)
+
+        self.priority.append(self.PRIORITY_CODES.get(record.get("priority"), self.UNKNOWN_PRIORITY_CODE))
+        self.lead_score.append(max(0, min(int(record.get("lead_score") or 0), 127)))
+        self.sentiment_code.append(code)
+
+    def _bincount(self, column: array, size: int) -> List[int]:
+        """Count occurrences of each code 0..size-1 in a column"""
+        if not column:
+            return [0] * size
+        if NUMPY_AVAILABLE:
+            values = np.frombuffer(column, dtype=np.dtype(column.typecode))
+            return np.bincount(values, minlength=size).tolist()
+        counts = Counter(column)
+        return [counts.get(code, 0) for code in range(size)]
+
+    def counts_by_priority(self) -> Dict[str, int]:
+        """Number of escalations per priority level (plus "unknown" if any row lacks one)"""
+        counts = self._bincount(self.priority, self.UNKNOWN_PRIORITY_CODE + 1)
+        by_priority = {priority: counts[code] for priority, code in self.PRIORITY_CODES.items()}
+        if counts[self.UNKNOWN_PRIORITY_CODE]:
+            by_priority[self.UNKNOWN_PRIORITY] = counts[self.UNKNOWN_PRIORITY_CODE]
+        return by_priority
+
+    def counts_by_sentiment(self) -> Dict[str, int]:
+        """Number of escalations per customer sentiment"""
+        counts = self._bincount(self.sentiment_code, len(self.sentiments))
+        return dict(zip(self.sentiments, counts))
+
+    def mean_lead_score(self) -> float:
+        """Average lead score over all escalations"""
+        if not self.lead_score:
+            return 0.0
+        if NUMPY_AVAILABLE:
+            return float(np.frombuffer(self.lead_score, dtype=np.int8).mean())
+        return sum(self.lead_score) / len(self.lead_score)
 
 
 class EscalationEngine:
@@ -107,94 +351,59 @@ class EscalationEngine:
     2. Environment variables
     3. Default built-in rules
     """
+    # Shared across engines so escalation IDs stay unique within a process
+    _id_counter = itertools.count(1)
+
     def __init__(self, config=None):
         self.config = config
+        # Resolved config data (escalation_rules / escalation_triggers), if any
+        self._config_data = getattr(config, "_config", None)
         self.escalation_rules = self._load_rules()
         self.escalation_triggers = self._load_triggers()
+        self._keywords = self._load_keywords()
+
+        # Non-keyword triggers read by should_escalate on every message
+        triggers = self.escalation_triggers
+        self._escalation_sentiments = frozenset(triggers.get("sentiment_escalation", ("angry",)))
+        self._max_turns = triggers.get("max_conversation_turns", 8)
+        self._min_lead_score = triggers.get("min_lead_score_for_escalation", 5)
 
     def _load_rules(self) -> Dict[EscalationReason, Dict[str, Any]]:
         """Load escalation rules from config or use defaults"""
         # Check if config has escalation rules
-        if self.config and hasattr(self.config, '_config'):
-            config_rules = getattr(self.config._config, 'escalation_rules', None)
-            if config_rules:
-                return self._parse_config_rules(config_rules)
+        config_rules = getattr(self._config_data, 'escalation_rules', None)
+        if config_rules:
+            return self._parse_config_rules(config_rules)
 
         # Default rules
-        return {
-            EscalationReason.LEGAL_THREAT: {
-                "priority": EscalationPriority.CRITICAL,
-                "auto_escalate": True,
-                "notify": ["legal", "management"],
-                "response_template": "Jag kopplar dig direkt till vår jurist."
-            },
-            EscalationReason.ANGRY_CUSTOMER: {
-                "priority": EscalationPriority.HIGH,
-                "auto_escalate": True,
-                "notify": ["support_lead"],
-                "response_template": "Jag förstår att du är frustrerad. Låt mig koppla dig till en chef som kan hjälpa dig direkt."
-            },
-            EscalationReason.TECHNICAL_ISSUE: {
-                "priority": EscalationPriority.MEDIUM,
-                "auto_escalate": False,  # Try to solve first
-                "notify": ["technical"],
-                "response_template": "Detta verkar vara ett tekniskt problem. Jag eskalerar detta till vårt tekniska team."
-            },
-            EscalationReason.REFUND_DISPUTE: {
-                "priority": EscalationPriority.HIGH,
-                "auto_escalate": True,
-                "notify": ["billing", "support"],
-                "response_template": "Jag förstår angående din återbetalning. Låt mig koppla dig till vår avdelning som hanterar detta."
-            },
-            EscalationReason.MANAGER_REQUEST: {
-                "priority": EscalationPriority.HIGH,
-                "auto_escalate": True,
-                "notify": ["support_lead"],
-                "response_template": "Självklart, jag kopplar dig till en chef."
-            },
-            EscalationReason.COMPLEX_CASE: {
-                "priority": EscalationPriority.MEDIUM,
-                "auto_escalate": False,
-                "notify": ["support"],
-                "response_template": "Detta är en lite mer komplex fråga. Låt mig koppla dig till rätt person."
-            },
-            EscalationReason.BILLING_ERROR: {
-                "priority": EscalationPriority.HIGH,
-                "auto_escalate": True,
-                "notify": ["billing"],
-                "response_template": "Jag ser att det är ett problem med din betalning. Jag eskalerar detta direkt."
-            },
-            EscalationReason.CONTRACTUAL: {
-                "priority": EscalationPriority.HIGH,
-                "auto_escalate": True,
-                "notify": ["legal", "sales"],
-                "response_template": "När det gäller avtal och kontrakt kopplar jag dig till rätt person."
-            }
-        }
+        return ESCALATION_RULES
 
     def _load_triggers(self) -> Dict[str, Any]:
         """Load escalation triggers from config or use defaults"""
-        # Check environment variables first
-        triggers = {
-            "max_conversation_turns": int(os.getenv("ESCALATION_MAX_TURNS", "8")),
-            "min_lead_score_for_escalation": int(os.getenv("ESCALATION_MIN_LEAD_SCORE", "4")),
-            "sentiment_escalation": os.getenv("ESCALATION_SENTIMENT", "angry,frustrated").split(","),
-            "keyword_triggers": {
-                "legal": os.getenv("ESCALATION_LEGAL_KEYWORDS", "lagar,advokat,konsumentverket,polisen,stämma").split(","),
-                "manager": os.getenv("ESCALATION_MANAGER_KEYWORDS", "chef,manager,ledning,överordnad").split(","),
-                "billing": os.getenv("ESCALATION_BILLING_KEYWORDS", "faktureringsfel,felaktig betalning,dragen pengar").split(","),
-                "contract": os.getenv("ESCALATION_CONTRACT_KEYWORDS", "avtal,kontrakt,bindande").split(","),
-            }
-        }
+        # Environment defaults, parsed once per process
+        triggers = dict(_default_triggers())
 
         # Check if config has escalation triggers
-        if self.config and hasattr(self.config, '_config'):
-            config_triggers = getattr(self.config._config, 'escalation_triggers', None)
-            if config_triggers:
-                triggers.update(config_triggers)
+        config_triggers = getattr(self._config_data, 'escalation_triggers', None)
+        if config_triggers:
+            triggers.update(config_triggers)
 
         return triggers
 
+    def _load_keywords(self) -> Dict[str, tuple]:
+        """
+        Lowercased keyword tuples per trigger group
+
+        should_escalate lowercases the message once and runs plain substring
+        checks, group by group in priority order; this benchmarks faster than
+        one combined case-insensitive regex on typical chat messages.
+        """
+        keyword_triggers = self.escalation_triggers.get("keyword_triggers", {})
+        return {
+            group: tuple(word.lower() for word in keyword_triggers.get(group, ()) if word)
+            for group in KEYWORD_GROUPS
+        }
+
     def _parse_config_rules(self, config_rules: Dict) -> Dict[EscalationReason, Dict[str, Any]]:
         """Parse escalation rules from config"""
         rules = {}
@@ -226,18 +435,22 @@ class EscalationEngine:
         Returns:
             Tuple of (should_escalate, reason)
         """
-        triggers = self.escalation_triggers
+        message_lc = message.lower()
+        keywords = self._keywords
+
+        # Triggers are checked in priority order and the first hit returns,
+        # so a legal keyword ends the scan before any other group is searched
 
         # Legal threat (configurable keywords)
-        if any(word in message.lower() for word in triggers["keyword_triggers"].get("legal", [])):
+        if any(word in message_lc for word in keywords["legal"]):
             return True, EscalationReason.LEGAL_THREAT
 
         # Angry customer (configurable sentiments)
-        if sentiment in triggers.get("sentiment_escalation", ["angry"]):
+        if sentiment in self._escalation_sentiments:
             return True, EscalationReason.ANGRY_CUSTOMER
 
         # Manager request (configurable keywords)
-        if any(word in message.lower() for word in triggers["keyword_triggers"].get("manager", [])):
+        if any(word in message_lc for word in keywords["manager"]):
             return True, EscalationReason.MANAGER_REQUEST
 
         # Technical issue after multiple attempts
@@ -245,30 +458,41 @@ class EscalationEngine:
             return True, EscalationReason.TECHNICAL_ISSUE
 
         # Refund dispute
-        if intent == "refund_request" and sentiment in ["frustrated", "angry"]:
+        if intent == "refund_request" and sentiment in REFUND_DISPUTE_SENTIMENTS:
             return True, EscalationReason.REFUND_DISPUTE
 
         # Complex case (configurable max turns)
-        max_turns = triggers.get("max_conversation_turns", 8)
-        if conversation_turns > max_turns:
+        if conversation_turns > self._max_turns:
             return True, EscalationReason.COMPLEX_CASE
 
         # Billing issue (configurable keywords)
-        if any(word in message.lower() for word in triggers["keyword_triggers"].get("billing", [])):
+        if any(word in message_lc for word in keywords["billing"]):
             return True, EscalationReason.BILLING_ERROR
 
         # Contractual (configurable keywords)
-        if any(word in message.lower() for word in triggers["keyword_triggers"].get("contract", [])):
+        if any(word in message_lc for word in keywords["contract"]):
             return True, EscalationReason.CONTRACTUAL
 
         # High lead score escalation (configurable threshold)
-        min_lead = triggers.get("min_lead_score_for_escalation", 5)
-        if lead_score >= min_lead:
+        if lead_score >= self._min_lead_score:
             # Don't auto-escalate just for lead score, but mark for human review
             return False, None
 
         return False, None
 
+    def should_escalate_batch(self, cases: List[Dict[str, Any]]) -> List[tuple[bool, Optional[EscalationReason]]]:
+        """
+        Run should_escalate over many cases, e.g. when re-scoring saved conversations
+
+        Each case is a dict with the should_escalate keyword arguments.
+        """
+        decide = self.should_escalate
+        return [
+            decide(case["intent"], case["sentiment"], case["lead_score"],
+                   case["conversation_turns"], case["message"])
+            for case in cases
+        ]
+
     def create_escalation_packet(self, conversation_data: Dict[str, Any],
                                  reason: EscalationReason) -> EscalationContext:
         """
@@ -289,11 +513,15 @@ class EscalationEngine:
         # Extract customer issue
         customer_issue = self._extract_customer_issue(conversation_data)
 
+        # One clock read for both the ID and the timestamp
+        epoch, nanos = divmod(time.time_ns(), 1_000_000_000)
+        now = datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None, microsecond=nanos // 1000)
+
         # Build escalation context
         return EscalationContext(
-            escalation_id=f"esc_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}",
+            escalation_id=f"esc_{epoch}_{next(self._id_counter)}",
             conversation_id=conversation_data.get("conversation_id", "unknown"),
-            timestamp=datetime.utcnow().isoformat(),
+            timestamp=now.isoformat(),
             priority=rule["priority"],
             reason=reason,
             summary=summary,
@@ -322,21 +550,15 @@ class EscalationEngine:
         sentiment = conversation_data.get("current_sentiment", "unknown")
         turns = conversation_data.get("message_count", 0)
 
-        summaries = {
-            EscalationReason.LEGAL_THREAT: f"Kunden har nämnt legala åtgärder. Detta kräver omedelbar hantering av jurist.",
-            EscalationReason.ANGRY_CUSTOMER: f"Kunden är mycket frustrerad/arg ({sentiment}). Har samtalat i {turns} rundor utan lösning.",
-            EscalationReason.TECHNICAL_ISSUE: f"Tekniskt problem som inte kunnat lösas efter {turns} försök.",
-            EscalationReason.REFUND_DISPUTE: f"Kunden vill ha återbetalning och är {sentiment}. Kräver manuell hantering.",
-            EscalationReason.MANAGER_REQUEST: f"Kunden har specifikt begärt att prata med en chef.",
-            EscalationReason.COMPLEX_CASE: f"Komplext ärende som kräver {turns}+ samtal och mänsklig bedömning.",
-            EscalationReason.BILLING_ERROR: f"Fel i betalningssystemet som kräver omedelbar åtgärd.",
-            EscalationReason.CONTRACTUAL: f"Frågor rörande avtal/kontrakt som kräver juridisk kompetens."
-        }
-
-        return summaries.get(reason, f"Eskalering efter {turns} samtal. Intent: {intent}, Sentiment: {sentiment}")
+        template = SUMMARY_TEMPLATES.get(reason, FALLBACK_SUMMARY_TEMPLATE)
+        return template.format(turns=turns, sentiment=sentiment, intent=intent)
 
     def _extract_customer_issue(self, conversation_data: Dict[str, Any]) -> str:
         """Extract the core customer issue"""
+        first_user_message = conversation_data.get("first_user_message")
+        if first_user_message is not None:
+            return first_user_message[:200]
+
         messages = conversation_data.get("messages", [])
         if not messages:
             return "Ingen beskrivning tillgänglig"
@@ -350,48 +572,15 @@ class EscalationEngine:
 
     def _summarize_messages(self, messages: List[Dict[str, str]]) -> List[str]:
         """Create a summary of messages"""
-        summaries = []
-        for msg in messages[-5:]:  # Last 5 messages
-            role = msg.get("role", "unknown")
-            content = msg.get("content", "")[:100]
-            summaries.append(f"{role}: {content}...")
-        return summaries
+        # Last 5 messages; deques and other non-sliceable sequences are read from the end
+        recent = messages[-5:] if isinstance(messages, list) else list(messages)[-5:]
+        return [f"{msg.get('role', 'unknown')}: {msg.get('content', '')[:100]}..." for msg in recent]
 
     def _generate_suggested_actions(self, reason: EscalationReason,
                                     conversation_data: Dict[str, Any]) -> List[str]:
         """Generate suggested actions for human agent"""
-        actions = []
-
-        # Always suggest reading the conversation
-        actions.append("Läs igenom konversationen för kontext")
-
-        # Reason-specific actions
-        if reason == EscalationReason.ANGRY_CUSTOMER:
-            actions.extend([
-                "Bekräfta kundens känslor",
-                "Erbjud kompensation/lösning snabbt",
-                "Följ upp personligen inom 24h"
-            ])
-        elif reason == EscalationReason.TECHNICAL_ISSUE:
-            actions.extend([
-                "Samla in felmeddelanden/loggar",
-                "Kontakta tekniska teamet",
-                "Ge kunden tidsuppskattning"
-            ])
-        elif reason == EscalationReason.REFUND_DISPUTE:
-            actions.extend([
-                "Verifiera köp och betalningsstatus",
-                "Kontrollera refund policy",
-                "Gör bedömning baserat på policy"
-            ])
-        elif reason == EscalationReason.LEGAL_THREAT:
-            actions.extend([
-                "Omedelbar kontakt med juridik",
-                "Dokumentera allting noga",
-                "Svara ej innan konsulterat jurist"
-            ])
-
-        return actions
+        # Always suggest reading the conversation, then any reason-specific steps
+        return [BASE_SUGGESTED_ACTION, *SUGGESTED_ACTIONS.get(reason, ())]
 
     def get_escalation_response(self, reason: EscalationReason,
                                 contact_info: str = None) -> str:
@@ -410,14 +599,15 @@ class EscalationNotifier:
     Handle notifications when escalation occurs
     """
     def __init__(self):
-        self.notification_channels = []
+        # Channels are added at startup and iterated per escalation, so keep a tuple
+        self.notification_channels: Tuple[Dict[str, Any], ...] = ()
 
     def add_channel(self, channel_type: str, config: Dict[str, Any]) -> None:
         """Add a notification channel"""
-        self.notification_channels.append({
+        self.notification_channels += ({
             "type": channel_type,
             "config": config
-        })
+        },)
 
     def notify(self, escalation: EscalationContext) -> bool:
         """
@@ -472,11 +662,8 @@ if __name__ == "__main__":
         }
     ]
 
-    for i, case in enumerate(test_cases, 1):
-        should_escalate, reason = engine.should_escalate(
-            case["intent"], case["sentiment"], case["lead_score"],
-            case["conversation_turns"], case["message"]
-        )
+    decisions = engine.should_escalate_batch(test_cases)
+    for i, (case, (should_escalate, reason)) in enumerate(zip(test_cases, decisions), 1):
         print(f"\nTest {i}: {case['message']}")
         print(f"  Escalate: {should_escalate}")
         if reason:
@@ -509,4 +696,22 @@ if __name__ == "__main__":
         conversation_data,
         EscalationReason.TECHNICAL_ISSUE
     )
-    print(packet.to_json())
+    print(packet.to_json(pretty=True))
+
+    # Micro-benchmarks for the two hot paths
+    print("\n--- Benchmarks ---")
+    rounds = 100_000
+    case = test_cases[1]
+    start = time.perf_counter_ns()
+    for _ in range(rounds):
+        engine.should_escalate(case["intent"], case["sentiment"], case["lead_score"],
+                               case["conversation_turns"], case["message"])
+    elapsed = time.perf_counter_ns() - start
+    print(f"should_escalate: {elapsed / rounds:.0f} ns/call ({rounds} calls)")
+
+    rounds = 10_000
+    start = time.perf_counter_ns()
+    for _ in range(rounds):
+        engine.create_escalation_packet(conversation_data, EscalationReason.TECHNICAL_ISSUE).to_json_bytes()
+    elapsed = time.perf_counter_ns() - start
+    print(f"create_escalation_packet + to_json_bytes: {elapsed / rounds / 1000:.1f} µs/packet ({rounds} packets)")
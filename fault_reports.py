@@ -4,12 +4,55 @@ SUPPORT STARTER AI - FAULT REPORT SYSTEM
 Handle fault reports with urgency detection and auto-escalation
 """
 
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Mapping, Tuple
+from types import MappingProxyType
+from dataclasses import dataclass, field, replace
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from datetime import datetime
+import atexit
+import functools
 import re
 import os
+import threading
+import time
+
+
+# Number of recent messages whose urgency/category results are cached
+DETECTION_CACHE_SIZE = 1024
+
+# Incomplete reports are dropped after this long without a message from the
+# reporter, and the least recently active ones beyond MAX_PENDING_REPORTS
+PENDING_REPORT_TIMEOUT_SECONDS = 24 * 60 * 60
+MAX_PENDING_REPORTS = 1000
+
+# Placeholder for report fields the reporter has not given
+NOT_PROVIDED = "Ej angivet"
+
+# Follow-up questions keyed by (has location, has email or phone)
+LOCATION_QUESTION = "Vilken adress och lägenhetsnummer gäller det?"
+CONTACT_QUESTION = "Vilket telefonnummer eller e-postadress kan vi nå dig på?"
+COLLECTION_QUESTIONS: Mapping[Tuple[bool, bool], Tuple[str, ...]] = MappingProxyType({
+    (False, False): (LOCATION_QUESTION, CONTACT_QUESTION),
+    (False, True): (LOCATION_QUESTION,),
+    (True, False): (CONTACT_QUESTION,),
+    (True, True): ()
+})
+
+# Escalation notification for urgent fault reports
+ESCALATION_MESSAGE_TEMPLATE = """AKUT FELANMÄLAN - {urgency}
+
+Kategori: {category}
+Beskrivning: {description}
+
+Anmälare: {reporter_name}
+Email: {reporter_email}
+Telefon: {reporter_phone}
+
+Plats: {location}
+
+Tid: {timestamp}"""
 
 
 class UrgencyLevel(Enum):
@@ -20,6 +63,10 @@ class UrgencyLevel(Enum):
     CRITICAL = "critical"
 
 
+# Urgency levels that notify the on-call team before the report is complete
+IMMEDIATE_ESCALATION_URGENCIES = frozenset({UrgencyLevel.CRITICAL, UrgencyLevel.HIGH})
+
+
 class FaultCategory(Enum):
     """Categories of faults"""
     WATER = "water"  # Vattenläcka, avlopp
@@ -32,7 +79,63 @@ class FaultCategory(Enum):
     OTHER = "other"
 
 
-@dataclass
+# Upper-case labels used in escalation messages and report emails
+URGENCY_LABELS: Mapping[UrgencyLevel, str] = MappingProxyType({level: level.value.upper() for level in UrgencyLevel})
+CATEGORY_LABELS: Mapping[FaultCategory, str] = MappingProxyType({category: category.value.upper() for category in FaultCategory})
+
+
+# Contact and location extraction, tried in order; the first match wins
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+PHONE_PATTERNS: Tuple[re.Pattern, ...] = tuple(re.compile(pattern) for pattern in (
+    r'\b0[0-9]{1,3}[- ]?[0-9]{3}[- ]?[0-9]{2}[- ]?[0-9]{2}\b',
+    r'\b0[0-9]{2,3}[- ]?[0-9]{5,7}\b',
+    r'\b07[0,2,3,6,9][- ]?[0-9]{3}[- ]?[0-9]{2}[- ]?[0-9]{2}\b'
+))
+LOCATION_PATTERNS: Tuple[re.Pattern, ...] = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(?:lägenhetsnummer|lgh|lägenhet)\s*:?\s*([A-Za-z0-9\s]+?)(?:\.|,|\s|$)',
+    r'([A-Z][a-z]+(?:sgatan|vägen|gatan))\s*(\d+)',
+    r'(?:i|på)\s+(?:lägenhet|lgh)\s*(\d+)',
+    r'(?:bor i|adress|ligger)\s+([A-Z][a-z]+(?:sgatan|vägen|gatan))?\s*(\d+)?',
+    r'lgh\s*(\d+)',
+))
+
+
+# Leading literal of a regex alternative, up to the first metacharacter
+_LEADING_LITERAL = re.compile(r"[^\\.^$*+?{}\[\]()|]+")
+
+
+def _literal_prefixes(pattern: str) -> Optional[List[str]]:
+    """
+    Literal text that each alternative of a single-group (a|b|c) pattern starts with
+
+    Returns None for pattern shapes this does not understand (nested groups,
+    character classes, alternatives starting with a metacharacter).
+    """
+    body = pattern
+    if body.startswith(r"\b"):
+        body = body[2:]
+    if body.endswith(r"\b"):
+        body = body[:-2]
+    if not (body.startswith("(") and body.endswith(")")):
+        return None
+    body = body[1:-1]
+    if any(char in body for char in "()[]\\"):
+        return None
+
+    prefixes = []
+    for alternative in body.split("|"):
+        match = _LEADING_LITERAL.match(alternative)
+        literal = match.group() if match else ""
+        # A quantifier right after the literal makes its last character optional
+        if alternative[len(literal):len(literal) + 1] in ("?", "*", "{"):
+            literal = literal[:-1]
+        if not literal:
+            return None
+        prefixes.append(literal)
+    return prefixes
+
+
+@dataclass(slots=True)
 class FaultReport:
     """Fault report data structure"""
     report_id: str
@@ -66,14 +169,139 @@ class FaultReport:
             "urgency": self.urgency.value if isinstance(self.urgency, UrgencyLevel) else self.urgency,
             "description": self.description,
             "location": self.location,
-            "reporter_name": self.reporter_name or "Ej angivet",
-            "reporter_email": self.reporter_email or "Ej angivet",
-            "reporter_phone": self.reporter_phone or "Ej angivet",
+            "reporter_name": self.reporter_name or NOT_PROVIDED,
+            "reporter_email": self.reporter_email or NOT_PROVIDED,
+            "reporter_phone": self.reporter_phone or NOT_PROVIDED,
             "timestamp": self.timestamp,
             "status": self.status
         }
 
 
+# Category detection patterns; a category scores one point per matching pattern
+CATEGORY_PATTERNS: Mapping[FaultCategory, Tuple[str, ...]] = MappingProxyType({
+    FaultCategory.WATER: (
+        r"(vatten|avlopp|diskmaskin|tvättmaskin|kran|toalett|wc|spola|läcker|droppar)",
+        r"(vattenläcka|vatten.*skada|översvämning|fukt|mögel|vattenskada)",
+        r"(badrum|kök|diskho|handfat|dusch|golvet|tak.*vatten)",
+        r"(water|drain|dishwasher|washing.*?machine|faucet|toilet|leak|drip)"
+    ),
+    FaultCategory.ELECTRICAL: (
+        r"(ström|ljus|lampa|uttag|brytare|säkring|elektrisk|glimra|strömavbrott)",
+        r"(ingen.*ström|ström.*borta|sälning|fas|utr.*slår|slå.*ej)",
+        r"(power|electric|light|lamp|outlet|switch|fuse|spark|blackout)"
+    ),
+    FaultCategory.HEATING: (
+        r"(element|ventilation|termostat|radiator|kyla.*?inomhus|fryser.*?inomhus|ingen.*värme)",
+        r"(värme.*ej|kallt.*i|element.*kall|radiator.*ej)",
+        r"(heating|radiator|thermostat|freezing.*?inside|no.*?heat)"
+    ),
+    FaultCategory.SECURITY: (
+        r"(utelåst|låst.*ute|nyckel|lås|inbrott|skadegörelse|larm|dörr|fönster)",
+        r"(kommer.*inte.*in|tappat.*nyckel|nyckel.*borta|glömde.*nyckel|låset.*går)",
+        r"(lock.*?out|locked.*?out|break.?in|burglary|vandalism|alarm)"
+    ),
+    FaultCategory.STRUCTURAL: (
+        r"(tak|vägg|golv|taklucka|spricka|skada|väggbeklädnad|hål|skador)",
+        r"(fönster|dörr|fönsterkarm|krossad|krossat|balkong)",
+        r"(roof|wall|floor|ceiling|crack|damage)"
+    ),
+    FaultCategory.APPLIANCE: (
+        r"(spis|ugn|kylskåp|frys|diskmaskin|tvättmaskin|torktumlare|vitvaror)",
+        r"(stove|oven|fridge|dishwasher|washing.*?machine|dryer)"
+    ),
+    FaultCategory.NOISE: (
+        r"(granne|grannar|stör|musik|buller|ljud|hög.*|horn|skrik|bråk|fest|partaj|duns|bank|smäll)",
+        r"(nattstörning|natten.*stör|högt|volym|bas|duns)",
+        r"(neighbor|noise|loud|music|party|shouting|fighting)"
+    )
+})
+
+# Urgency patterns, checked from most to least urgent
+URGENCY_PATTERNS: Mapping[UrgencyLevel, Tuple[str, ...]] = MappingProxyType({
+    # CRITICAL - Life safety or property damage
+    UrgencyLevel.CRITICAL: (
+        # Water related - Swedish
+        r"\b(vattenläcka|vatten.*läcker|vatten.*strömmar|vatten.*sprutar|översvämning|vatten.*skador|stora.*vatten)\b",
+        r"\b(läcker.*vatten|rör.*brust|rör.*sprutar|avlopp.*stopp.*vatten)\b",
+        r"\b(kök.*vattenläcka|badrum.*vattenläcka|golvet.*vatten|tak.*vatten|vatten.*igenom)\b",
+        # Fire/Gas - Swedish
+        r"\b(brinner|brand|gasläcka|gas.*luktar|eld|rök|luktar.*gas|eldsvåda)\b",
+        # Lockout - Swedish
+        r"\b(låst.*ute|utelåst|kommer.*inte.*in|tappat.*nyckel|nyckel.*borta|glömde.*nyckel|låset.*går.*inte|stängd.*ute)\b",
+        # Break-in - Swedish
+        r"\b(inbrott|skadegörelse|krossat|försöker.*ta.*sig|krossat.*fönster|völker.*in|stöld)\b",
+        # General emergency - Swedish
+        r"\b(akut!|akut.*!|kritiskt|oj!*|hjälp!*|nödan|tvingas|polis|ambulans|brandkår|rädda)\b"
+    ),
+
+    # HIGH - Important issues affecting comfort/safety
+    UrgencyLevel.HIGH: (
+        # Water - Swedish
+        r"\b(ingen.*varmvatten|inget.*vatten|vattnet.*går|kranen.*ger.*inget|vatten.*borta)\b",
+        r"\b(avlopp.*stopp|avlopp.*backar|toilet.*stopp|wc.*stopp|spola.*ej.*går)\b",
+        # Heating - Swedish
+        r"\b(ingen.*värme|elementen.*kalla|kallt.*i.*lägenheten|kyla.*inomhus|fryser.*inomhus)\b",
+        r"\b(termostat.*inte|värme.*ej|element.*ej|radiator.*kall|inget.*värme)\b",
+        # Electricity - Swedish
+        r"\b(ingen.*ström|strömavbrott|ström.*borta|elektricitet.*borta|ljus.*släckt)\b",
+        r"\b(går.*ej.*slå|slå.*ej.*på|uttags.*ej|brytare.*ej|säkring.*gått|sälning|fas.*borta)\b",
+        # Lock issues
+        r"\b(lås.*gått.*sönder|nyckel.*fast|dörr.*går.*inte.*öppna|nyckel.*fastnat|vrider.*ej)\b"
+    ),
+
+    # MEDIUM - Annoying issues
+    UrgencyLevel.MEDIUM: (
+        # Water leaks (minor)
+        r"\b(droppar|läcker|kran|droppande|läcker.*lite|vatten.*droppar)\b",
+        r"\b(tappkran|handfat|diskho|badrumskran|kran.*läcker)\b",
+        # Noise
+        r"\b(låter|buller|konstig.*ljud|problem.*med|fungerar.*dåligt)\b",
+        r"\b(granne|grannar|musik|stör|bråk|fest|partaj|skrik|ljud|hög.*|natt)\b",
+        # General issues
+        r"\b(anmälan|felanmälan|anmäla|reparation|trasig|trasigt|fungerar.*ej|gått.*sönder|högrsa)\b"
+    )
+})
+
+# Compiled once at import and shared by every FaultReportSystem. Patterns are
+# lowercase and run against lowercased text, which is faster in sre than
+# re.IGNORECASE. Each urgency level is one alternation, so a level costs one search.
+_URGENCY_COMPILED: Dict[UrgencyLevel, re.Pattern] = {
+    level: re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+    for level, patterns in URGENCY_PATTERNS.items()
+}
+_CATEGORY_COMPILED: Dict[FaultCategory, List[re.Pattern]] = {
+    category: [re.compile(pattern) for pattern in patterns]
+    for category, patterns in CATEGORY_PATTERNS.items()
+}
+
+
+def _compile_keyword_prefilter() -> Optional[re.Pattern]:
+    """
+    Compile the leading literals of all detection patterns into one regex
+
+    Any urgency or category match contains one of these literals, so a
+    message without them is LOW urgency in category OTHER. Returns None
+    (no prefilter) if some pattern has no literal to anchor on.
+    """
+    patterns = [pattern for patterns in URGENCY_PATTERNS.values() for pattern in patterns]
+    patterns += [pattern for patterns in CATEGORY_PATTERNS.values() for pattern in patterns]
+
+    literals = set()
+    for pattern in patterns:
+        prefixes = _literal_prefixes(pattern)
+        if prefixes is None:
+            return None
+        literals.update(prefixes)
+
+    # A literal that contains a shorter one adds nothing to the search
+    minimal = [lit for lit in literals if not any(other != lit and other in lit for other in literals)]
+    return re.compile("|".join(re.escape(lit) for lit in sorted(minimal)))
+
+
+# One literal search that rules out every pattern for most non-fault messages
+_KEYWORD_PREFILTER = _compile_keyword_prefilter()
+
+
 class FaultReportSystem:
     """
     System for collecting and managing fault reports
@@ -85,8 +313,9 @@ class FaultReportSystem:
             from config_loader import load_config_or_default
             self.config = load_config_or_default()
 
-        # Store in-progress reports by session
-        self.pending_reports: Dict[str, FaultReport] = {}
+        # Store in-progress reports by session, least recently active first
+        self.pending_reports: "OrderedDict[str, FaultReport]" = OrderedDict()
+        self._pending_last_seen: Dict[str, float] = {}
 
         # Email configuration (from environment)
         self.smtp_host = os.getenv("SMTP_HOST", "")
@@ -95,6 +324,14 @@ class FaultReportSystem:
         self.smtp_pass = os.getenv("SMTP_PASS", "")
         self.admin_email = os.getenv("ADMIN_EMAIL", self.config.contact_email)
 
+        # Logged-in SMTP connection, reused across reports
+        self._smtp = None
+        self._smtp_lock = threading.Lock()
+
+        # Single worker so report emails go out in the order they were created
+        self._delivery_pool: Optional[ThreadPoolExecutor] = None
+        self._close_registered = False
+
         # Helper function to format responses
         def format_response(template):
             return template.format(phone=self.config.phone)
@@ -118,155 +355,95 @@ class FaultReportSystem:
             "waiting_for_info": "Uppfattat, jag noterar detta. "
         }
 
-        # Category detection patterns
-        self.category_patterns = {
-            FaultCategory.WATER: [
-                r"(vatten|avlopp|diskmaskin|tvättmaskin|kran|toalett|wc|spola|läcker|droppar)",
-                r"(vattenläcka|vatten.*skada|översvämning|fukt|mögel|vattenskada)",
-                r"(badrum|kök|diskho|handfat|dusch|golvet|tak.*vatten)",
-                r"(water|drain|dishwasher|washing.*?machine|faucet|toilet|leak|drip)"
-            ],
-            FaultCategory.ELECTRICAL: [
-                r"(ström|ljus|lampa|uttag|brytare|säkring|elektrisk|glimra|strömavbrott)",
-                r"(ingen.*ström|ström.*borta|sälning|fas|utr.*slår|slå.*ej)",
-                r"(power|electric|light|lamp|outlet|switch|fuse|spark|blackout)"
-            ],
-            FaultCategory.HEATING: [
-                r"(element|ventilation|termostat|radiator|kyla.*?inomhus|fryser.*?inomhus|ingen.*värme)",
-                r"(värme.*ej|kallt.*i|element.*kall|radiator.*ej)",
-                r"(heating|radiator|thermostat|freezing.*?inside|no.*?heat)"
-            ],
-            FaultCategory.SECURITY: [
-                r"(utelåst|låst.*ute|nyckel|lås|inbrott|skadegörelse|larm|dörr|fönster)",
-                r"(kommer.*inte.*in|tappat.*nyckel|nyckel.*borta|glömde.*nyckel|låset.*går)",
-                r"(lock.*?out|locked.*?out|break.?in|burglary|vandalism|alarm)"
-            ],
-            FaultCategory.STRUCTURAL: [
-                r"(tak|vägg|golv|taklucka|spricka|skada|väggbeklädnad|hål|skador)",
-                r"(fönster|dörr|fönsterkarm|krossad|krossat|balkong)",
-                r"(roof|wall|floor|ceiling|crack|damage)"
-            ],
-            FaultCategory.APPLIANCE: [
-                r"(spis|ugn|kylskåp|frys|diskmaskin|tvättmaskin|torktumlare|vitvaror)",
-                r"(stove|oven|fridge|dishwasher|washing.*?machine|dryer)"
-            ],
-            FaultCategory.NOISE: [
-                r"(granne|grannar|stör|musik|buller|ljud|hög.*|horn|skrik|bråk|fest|partaj|duns|bank|smäll)",
-                r"(nattstörning|natten.*stör|högt|volym|bas|duns)",
-                r"(neighbor|noise|loud|music|party|shouting|fighting)"
+        # Response for every (urgency, category) pair: category-specific
+        # responses where they exist, else the general one for the urgency
+        specific_responses = {
+            (UrgencyLevel.CRITICAL, FaultCategory.WATER): "fault_water_critical",
+            (UrgencyLevel.CRITICAL, FaultCategory.SECURITY): "fault_lockout",
+            (UrgencyLevel.HIGH, FaultCategory.WATER): "fault_water_high",
+            (UrgencyLevel.HIGH, FaultCategory.HEATING): "fault_heating_high",
+            (UrgencyLevel.HIGH, FaultCategory.ELECTRICAL): "fault_electric_high",
+            (UrgencyLevel.MEDIUM, FaultCategory.WATER): "fault_water_medium",
+            (UrgencyLevel.MEDIUM, FaultCategory.APPLIANCE): "fault_appliance_medium",
+            (UrgencyLevel.MEDIUM, FaultCategory.NOISE): "fault_noise_medium",
+        }
+        self._response_table = {
+            (urgency, category): self.responses[
+                specific_responses.get((urgency, category), f"fault_general_{urgency.value}")
             ]
+            for urgency in UrgencyLevel
+            for category in FaultCategory
         }
 
+        # Detection tables, compiled once per process (see module constants)
+        self.category_patterns = CATEGORY_PATTERNS
+        self.urgency_patterns = URGENCY_PATTERNS
+        self._urgency_compiled = _URGENCY_COMPILED
+        self._category_compiled = _CATEGORY_COMPILED
+        self._keyword_prefilter = _KEYWORD_PREFILTER
+
+        # Detection results for recently seen (lowercased) messages, so retried
+        # and repeated messages skip the regex work
+        self._urgency_cache = functools.lru_cache(maxsize=DETECTION_CACHE_SIZE)(self._detect_urgency_lower)
+        self._category_cache = functools.lru_cache(maxsize=DETECTION_CACHE_SIZE)(self._detect_category_lower)
+
     def detect_urgency(self, text: str) -> UrgencyLevel:
         """Detect urgency level from text"""
-        text_lower = text.lower()
-
-        # CRITICAL - Life safety or property damage
-        critical_patterns = [
-            # Water related - Swedish
-            r"\b(vattenläcka|vatten.*läcker|vatten.*strömmar|vatten.*sprutar|översvämning|vatten.*skador|stora.*vatten)\b",
-            r"\b(läcker.*vatten|vatten.*läcker|rör.*brust|rör.*sprutar|avlopp.*stopp.*vatten)\b",
-            r"\b(kök.*vattenläcka|badrum.*vattenläcka|golvet.*vatten|tak.*vatten|vatten.*igenom)\b",
-            # Fire/Gas - Swedish
-            r"\b(brinner|brand|gasläcka|gas.*luktar|eld|rök|luktar.*gas|eldsvåda)\b",
-            # Lockout - Swedish
-            r"\b(låst.*ute|utelåst|kommer.*inte.*in|tappat.*nyckel|nyckel.*borta|glömde.*nyckel|låset.*går.*inte|stängd.*ute)\b",
-            # Break-in - Swedish
-            r"\b(inbrott|skadegörelse|krossat|försöker.*ta.*sig|krossat.*fönster|völker.*in|stöld)\b",
-            # General emergency - Swedish
-            r"\b(akut!|akut.*!|kritiskt|oj!*|hjälp!*|nödan|tvingas|polis|ambulans|brandkår|rädda)\b"
-        ]
-
-        # HIGH - Important issues affecting comfort/safety
-        high_patterns = [
-            # Water - Swedish
-            r"\b(ingen.*varmvatten|inget.*vatten|vattnet.*går|kranen.*ger.*inget|vatten.*borta)\b",
-            r"\b(avlopp.*stopp|avlopp.*backar|toilet.*stopp|wc.*stopp|spola.*ej.*går)\b",
-            # Heating - Swedish
-            r"\b(ingen.*värme|elementen.*kalla|kallt.*i.*lägenheten|kyla.*inomhus|fryser.*inomhus)\b",
-            r"\b(termostat.*inte|värme.*ej|element.*ej|radiator.*kall|inget.*värme)\b",
-            # Electricity - Swedish
-            r"\b(ingen.*ström|strömavbrott|ström.*borta|elektricitet.*borta|ljus.*släckt)\b",
-            r"\b(går.*ej.*slå|slå.*ej.*på|uttags.*ej|brytare.*ej|säkring.*gått|sälning|fas.*borta)\b",
-            # Lock issues
-            r"\b(lås.*gått.*sönder|nyckel.*fast|dörr.*går.*inte.*öppna|nyckel.*fastnat|vrider.*ej)\b"
-        ]
-
-        # MEDIUM - Annoying issues
-        medium_patterns = [
-            # Water leaks (minor)
-            r"\b(droppar|läcker|kran|droppande|läcker.*lite|vatten.*droppar)\b",
-            r"\b(tappkran|handfat|diskho|badrumskran|droppar|kran.*läcker)\b",
-            # Noise
-            r"\b(låter|buller|konstig.*ljud|problem.*med|fungerar.*dåligt)\b",
-            r"\b(granne|grannar|musik|stör|bråk|fest|partaj|skrik|ljud|hög.*|natt)\b",
-            # General issues
-            r"\b(anmälan|felanmälan|anmäla|reparation|trasig|trasigt|fungerar.*ej|gått.*sönder|högrsa)\b"
-        ]
-
-        for pattern in critical_patterns:
-            if re.search(pattern, text_lower):
-                return UrgencyLevel.CRITICAL
-
-        for pattern in high_patterns:
-            if re.search(pattern, text_lower):
-                return UrgencyLevel.HIGH
-
-        for pattern in medium_patterns:
-            if re.search(pattern, text_lower):
-                return UrgencyLevel.MEDIUM
-
-        return UrgencyLevel.LOW
+        return self._urgency_cache(text.lower())
 
     def detect_category(self, text: str) -> FaultCategory:
         """Detect fault category from text"""
-        text_lower = text.lower()
+        return self._category_cache(text.lower())
+
+    def classify(self, text: str) -> Tuple[UrgencyLevel, FaultCategory]:
+        """Detect urgency level and fault category from text"""
+        return self._classify_lower(text.lower())
+
+    def _classify_lower(self, text_lower: str) -> Tuple[UrgencyLevel, FaultCategory]:
+        """Detect urgency level and fault category from already lowercased text"""
+        if self._keyword_prefilter is not None and not self._keyword_prefilter.search(text_lower):
+            return UrgencyLevel.LOW, FaultCategory.OTHER
+        return self._urgency_cache(text_lower), self._category_cache(text_lower)
+
+    def classify_batch(self, messages: List[str]) -> List[Tuple[UrgencyLevel, FaultCategory]]:
+        """Run classify over many messages, e.g. when re-triaging a report backlog"""
+        classify = self.classify
+        return [classify(message) for message in messages]
+
+    def _detect_urgency_lower(self, text_lower: str) -> UrgencyLevel:
+        """Detect urgency level from already lowercased text"""
+        for level, pattern in self._urgency_compiled.items():
+            if pattern.search(text_lower):
+                return level
+
+        return UrgencyLevel.LOW
+
+    def _detect_category_lower(self, text_lower: str) -> FaultCategory:
+        """Detect fault category from already lowercased text"""
+        # The highest score wins and ties go to the earlier category, so a
+        # category is only scanned while it can still beat the best score
+        best_category, best_score = FaultCategory.OTHER, 0
+        for category, patterns in self._category_compiled.items():
+            remaining = len(patterns)
+            if remaining <= best_score:
+                continue
 
-        scores = {}
-        for category, patterns in self.category_patterns.items():
             score = 0
             for pattern in patterns:
-                if re.search(pattern, text_lower):
+                remaining -= 1
+                if pattern.search(text_lower):
                     score += 1
-            if score > 0:
-                scores[category] = score
+                elif score + remaining <= best_score:
+                    break
 
-        if scores:
-            return max(scores, key=scores.get)
-        return FaultCategory.OTHER
+            if score > best_score:
+                best_category, best_score = category, score
+
+        return best_category
 
     def get_response_for_urgency(self, urgency: UrgencyLevel, category: FaultCategory) -> str:
         """Get appropriate response based on urgency and category"""
-        if urgency == UrgencyLevel.CRITICAL:
-            if category == FaultCategory.WATER:
-                return self.responses["fault_water_critical"]
-            elif category == FaultCategory.SECURITY:
-                return self.responses["fault_lockout"]
-            else:
-                return self.responses["fault_general_critical"]
-
-        elif urgency == UrgencyLevel.HIGH:
-            if category == FaultCategory.WATER:
-                return self.responses["fault_water_high"]
-            elif category == FaultCategory.HEATING:
-                return self.responses["fault_heating_high"]
-            elif category == FaultCategory.ELECTRICAL:
-                return self.responses["fault_electric_high"]
-            else:
-                return self.responses["fault_general_high"]
-
-        elif urgency == UrgencyLevel.MEDIUM:
-            if category == FaultCategory.WATER:
-                return self.responses["fault_water_medium"]
-            elif category == FaultCategory.APPLIANCE:
-                return self.responses["fault_appliance_medium"]
-            elif category == FaultCategory.NOISE:
-                return self.responses["fault_noise_medium"]
-            else:
-                return self.responses["fault_general_medium"]
-
-        else:
-            return self.responses["fault_general_low"]
+        return self._response_table[(urgency, category)]
 
     def collect_fault_report(self, message: str, session_data: Dict) -> Dict:
         """
@@ -274,10 +451,13 @@ class FaultReportSystem:
         If there's a pending report for this session, try to update it.
         """
         session_id = session_data.get("session_id", "unknown")
+        message_lower = message.lower()
+        self.cleanup_expired_reports()
 
         # Check if there's a pending report for this session
         if session_id in self.pending_reports:
             report = self.pending_reports[session_id]
+            self._touch_pending(session_id)
 
             # Try to extract info from the message
             extracted = self._extract_info_from_message(message)
@@ -293,7 +473,7 @@ class FaultReportSystem:
                 report.reporter_name = extracted["name"]
 
             # Also append to description if it looks like additional info
-            if message.lower() not in report.description.lower():
+            if message_lower not in report.description.lower():
                 if report.description:
                     report.description += f"\n\nTilläggsinfo: {message}"
                 else:
@@ -303,10 +483,10 @@ class FaultReportSystem:
             if report.is_complete():
                 report.status = "complete"
                 del self.pending_reports[session_id]
+                self._pending_last_seen.pop(session_id, None)
 
                 # Send email and log to sheets
-                self._send_report_email(report)
-                self._log_to_google_sheets(report)
+                self._deliver_report(report)
 
                 return {
                     "report": report,
@@ -331,8 +511,7 @@ class FaultReportSystem:
             }
 
         # New fault report
-        urgency = self.detect_urgency(message)
-        category = self.detect_category(message)
+        urgency, category = self._classify_lower(message_lower)
 
         # Get the smart response based on urgency and category
         response = self.get_response_for_urgency(urgency, category)
@@ -345,9 +524,11 @@ class FaultReportSystem:
         # Extract info from message
         extracted = self._extract_info_from_message(message)
 
-        # Create report
+        # Create report; one clock read for both the ID and the timestamp
+        now = datetime.now()
         report = FaultReport(
-            report_id=f"fault_{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            report_id=f"fault_{now:%Y%m%d%H%M%S}",
+            timestamp=now.isoformat(),
             session_id=session_id,
             category=category,
             urgency=urgency,
@@ -361,8 +542,7 @@ class FaultReportSystem:
         # Check if complete or needs more info
         if report.is_complete():
             report.status = "complete"
-            self._send_report_email(report)
-            self._log_to_google_sheets(report)
+            self._deliver_report(report)
             return {
                 "report": report,
                 "response": self.responses["info_collected"],
@@ -374,6 +554,10 @@ class FaultReportSystem:
 
         # Need more info - store as pending
         self.pending_reports[session_id] = report
+        self._touch_pending(session_id)
+        while len(self.pending_reports) > MAX_PENDING_REPORTS:
+            evicted_id, _ = self.pending_reports.popitem(last=False)
+            self._pending_last_seen.pop(evicted_id, None)
         questions = self.get_collection_questions(report)
         follow_up = "\n\n" + "\n".join(f"{i+1}. {q}" for i, q in enumerate(questions))
 
@@ -381,8 +565,8 @@ class FaultReportSystem:
         should_escalate = self.should_escalate_immediately(urgency)
         if should_escalate:
             report.status = "escalated"
-            self._send_report_email(report)  # Send email immediately for urgent issues
-            print(f"🚨 IMMEDIATE ESCALATION for {report.report_id}: {urgency.value.upper()} - {category.value}")
+            self._deliver_report(report, log_to_sheets=False)  # Send email immediately for urgent issues
+            print(f"🚨 IMMEDIATE ESCALATION for {report.report_id}: {URGENCY_LABELS[urgency]} - {category.value}")
             # Add escalation notice to response
             follow_up += "\n\n⚠️ Vi har skickat en akut notis till jourteamet!"
 
@@ -395,37 +579,51 @@ class FaultReportSystem:
             "is_complete": False
         }
 
+    def _touch_pending(self, session_id: str) -> None:
+        """Mark a pending report as just active"""
+        self.pending_reports.move_to_end(session_id)
+        self._pending_last_seen[session_id] = time.monotonic()
+
+    def cleanup_expired_reports(self) -> int:
+        """Remove pending reports that have timed out"""
+        cutoff = time.monotonic() - PENDING_REPORT_TIMEOUT_SECONDS
+        removed = 0
+
+        # Reports are kept in activity order, so stop at the first live one
+        while self.pending_reports:
+            session_id = next(iter(self.pending_reports))
+            last_seen = self._pending_last_seen.get(session_id)
+            if last_seen is None:
+                # Added directly to pending_reports; start its clock now
+                self._touch_pending(session_id)
+                continue
+            if last_seen > cutoff:
+                break
+            del self.pending_reports[session_id]
+            self._pending_last_seen.pop(session_id, None)
+            removed += 1
+
+        return removed
+
     def _extract_info_from_message(self, message: str) -> Dict[str, str]:
         """Extract potential info like email, phone, location from message"""
         result = {}
 
         # Email
-        email_match = re.search(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', message)
+        email_match = EMAIL_PATTERN.search(message)
         if email_match:
             result["email"] = email_match.group()
 
         # Phone (Swedish formats)
-        phone_patterns = [
-            r'\b0[0-9]{1,3}[- ]?[0-9]{3}[- ]?[0-9]{2}[- ]?[0-9]{2}\b',
-            r'\b0[0-9]{2,3}[- ]?[0-9]{5,7}\b',
-            r'\b07[0,2,3,6,9][- ]?[0-9]{3}[- ]?[0-9]{2}[- ]?[0-9]{2}\b'
-        ]
-        for pattern in phone_patterns:
-            match = re.search(pattern, message)
+        for pattern in PHONE_PATTERNS:
+            match = pattern.search(message)
             if match:
                 result["phone"] = match.group()
                 break
 
         # Location/apartment number patterns
-        location_patterns = [
-            r'(?:lägenhetsnummer|lgh|lägenhet)\s*:?\s*([A-Za-z0-9\s]+?)(?:\.|,|\s|$)',
-            r'([A-Z][a-z]+(?:sgatan|vägen|gatan))\s*(\d+)',
-            r'(?:i|på)\s+(?:lägenhet|lgh)\s*(\d+)',
-            r'(?:bor i|adress|ligger)\s+([A-Z][a-z]+(?:sgatan|vägen|gatan))?\s*(\d+)?',
-            r'lgh\s*(\d+)',
-        ]
-        for pattern in location_patterns:
-            match = re.search(pattern, message, re.IGNORECASE)
+        for pattern in LOCATION_PATTERNS:
+            match = pattern.search(message)
             if match:
                 result["location"] = match.group(0).strip()
                 break
@@ -434,19 +632,93 @@ class FaultReportSystem:
 
     def should_escalate_immediately(self, urgency: UrgencyLevel) -> bool:
         """Determine if fault should be escalated immediately"""
-        return urgency in [UrgencyLevel.CRITICAL, UrgencyLevel.HIGH]
+        return urgency in IMMEDIATE_ESCALATION_URGENCIES
 
     def get_collection_questions(self, report: FaultReport) -> List[str]:
         """Get questions to ask for complete report"""
-        questions = []
-
-        if not report.location:
-            questions.append("Vilken adress och lägenhetsnummer gäller det?")
+        has_contact = bool(report.reporter_email or report.reporter_phone)
+        return list(COLLECTION_QUESTIONS[(bool(report.location), has_contact)])
 
-        if not report.reporter_email and not report.reporter_phone:
-            questions.append("Vilket telefonnummer eller e-postadress kan vi nå dig på?")
-
-        return questions
+    def _deliver_report(self, report: FaultReport, log_to_sheets: bool = True) -> None:
+        """Email the report and log it to Sheets without waiting on SMTP"""
+        if not self.smtp_host:
+            # Nothing goes over the network; keep the log output in order
+            self._send_report_email(report)
+            if log_to_sheets:
+                self._log_to_google_sheets(report)
+            return
+
+        if self._delivery_pool is None:
+            self._delivery_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fault-report")
+            self._register_close()
+
+        # Pending reports keep changing with follow-up messages, so send a snapshot
+        snapshot = replace(report)
+        self._delivery_pool.submit(self._send_report_email, snapshot)
+        if log_to_sheets:
+            self._delivery_pool.submit(self._log_to_google_sheets, snapshot)
+
+    def _register_close(self) -> None:
+        """Close deliveries and the SMTP connection when the process exits"""
+        if not self._close_registered:
+            atexit.register(self.close)
+            self._close_registered = True
+
+    def close(self) -> None:
+        """Finish queued report deliveries and close the SMTP connection"""
+        if self._delivery_pool is not None:
+            self._delivery_pool.shutdown(wait=True)
+            self._delivery_pool = None
+        with self._smtp_lock:
+            self._discard_smtp()
+
+    def _smtp_connection(self):
+        """Get the SMTP connection, connecting and logging in on first use"""
+        if self._smtp is None:
+            import smtplib
+
+            server = smtplib.SMTP(self.smtp_host, self.smtp_port)
+            try:
+                server.starttls()
+                if self.smtp_user and self.smtp_pass:
+                    server.login(self.smtp_user, self.smtp_pass)
+            except Exception:
+                server.close()
+                raise
+            self._smtp = server
+            self._register_close()
+        return self._smtp
+
+    def _discard_smtp(self) -> None:
+        """Close and forget the SMTP connection (caller holds _smtp_lock)"""
+        server, self._smtp = self._smtp, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            # The connection is already broken; just release the socket
+            server.close()
+
+    def _smtp_send(self, msg) -> None:
+        """Send over the shared SMTP connection, reconnecting once if it was dropped"""
+        import smtplib
+
+        with self._smtp_lock:
+            try:
+                try:
+                    self._smtp_connection().send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # The server dropped the idle connection; reconnect once
+                    self._discard_smtp()
+                    self._smtp_connection().send_message(msg)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+                # The server rejected this message; the connection is still usable
+                raise
+            except OSError:
+                # Do not reuse a connection left in an unknown state
+                self._discard_smtp()
+                raise
 
     def _send_report_email(self, report: FaultReport) -> bool:
         """Send fault report via email"""
@@ -459,19 +731,19 @@ class FaultReportSystem:
             body = f"""
 FELANMÄLAN - {report.report_id}
 
-Kategori: {report.category.value.upper()}
-Urgens: {report.urgency.value.upper()}
+Kategori: {CATEGORY_LABELS[report.category]}
+Urgens: {URGENCY_LABELS[report.urgency]}
 
 BESKRIVNING:
 {report.description}
 
 PLATS:
-{report.location or 'Ej angivet'}
+{report.location or NOT_PROVIDED}
 
 ANMÄLARE:
-Namn: {report.reporter_name or 'Ej angivet'}
-E-post: {report.reporter_email or 'Ej angivet'}
-Telefon: {report.reporter_phone or 'Ej angivet'}
+Namn: {report.reporter_name or NOT_PROVIDED}
+E-post: {report.reporter_email or NOT_PROVIDED}
+Telefon: {report.reporter_phone or NOT_PROVIDED}
 
 Session ID: {report.session_id}
 Tid: {report.timestamp}
@@ -482,25 +754,21 @@ Skickat från Vallhamragruppens AI-kundtjänst
             # Log email content
             print(f"Email for report {report.report_id}:")
             print(f"To: {self.admin_email}")
-            print(f"Subject: Felanmälan - {report.category.value.upper()} - {report.urgency.value.upper()}")
+            subject = f"Felanmälan - {CATEGORY_LABELS[report.category]} - {URGENCY_LABELS[report.urgency]}"
+            print(f"Subject: {subject}")
             print(f"Body:\n{body}")
 
             # Try to send email if SMTP is configured
             if self.smtp_host and self.smtp_host != "":
                 from email.message import EmailMessage
-                import smtplib
 
                 msg = EmailMessage()
-                msg["Subject"] = f"Felanmälan - {report.category.value.upper()} - {report.urgency.value.upper()}"
+                msg["Subject"] = subject
                 msg["From"] = self.smtp_user if self.smtp_user else self.admin_email
                 msg["To"] = self.admin_email
                 msg.set_content(body)
 
-                with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                    server.starttls()
-                    if self.smtp_user and self.smtp_pass:
-                        server.login(self.smtp_user, self.smtp_pass)
-                    server.send_message(msg)
+                self._smtp_send(msg)
                 print(f"Email sent successfully for report {report.report_id}")
                 return True
             else:
@@ -531,31 +799,32 @@ Skickat från Vallhamragruppens AI-kundtjänst
 
     def format_escalation_message(self, report: FaultReport) -> str:
         """Format fault report for escalation notification"""
-        return f"""
-AKUT FELANMÄLAN - {report.urgency.value.upper()}
-
-Kategori: {report.category.value}
-Beskrivning: {report.description}
-
-Anmälare: {report.reporter_name or 'Ej angivet'}
-Email: {report.reporter_email or 'Ej angivet'}
-Telefon: {report.reporter_phone or 'Ej angivet'}
-
-Plats: {report.location or 'Ej angivet'}
-
-Tid: {report.timestamp}
-        """.strip()
+        return ESCALATION_MESSAGE_TEMPLATE.format(
+            urgency=URGENCY_LABELS[report.urgency],
+            category=report.category.value,
+            description=report.description,
+            reporter_name=report.reporter_name or NOT_PROVIDED,
+            reporter_email=report.reporter_email or NOT_PROVIDED,
+            reporter_phone=report.reporter_phone or NOT_PROVIDED,
+            location=report.location or NOT_PROVIDED,
+            timestamp=report.timestamp
+        )
 
 
 # Singleton instance
 _fault_system: Optional[FaultReportSystem] = None
+_fault_system_lock = threading.Lock()
 
 
 def get_fault_system() -> FaultReportSystem:
     """Get fault report system instance"""
     global _fault_system
     if _fault_system is None:
-        _fault_system = FaultReportSystem()
+        # Bots share pending reports through this instance, so concurrent
+        # first calls must not each create their own
+        with _fault_system_lock:
+            if _fault_system is None:
+                _fault_system = FaultReportSystem()
     return _fault_system
 
 
@@ -48,6 +48,9 @@ class ConversationSession:
     escalation_count: int = 0
     resolved: bool = False
 
+    # First user message, kept for escalation summaries
+    first_user_message: Optional[str] = None
+
     def add_message(self, role: str, content: str, metadata: Optional[Dict] = None) -> None:
         """Add a message to the conversation"""
         self.messages.append({
@@ -56,6 +59,8 @@ class ConversationSession:
             "timestamp": datetime.utcnow().isoformat(),
             "metadata": metadata or {}
         })
+        if role == "user" and self.first_user_message is None:
+            self.first_user_message = content
         self.last_activity = datetime.utcnow().isoformat()
 
     def get_recent_messages(self, limit: int = 10) -> List[Dict[str, str]]:
@@ -7,6 +7,7 @@ SQLite-based persistent conversation and user memory
 import os
 import sqlite3
 import json
+import threading
 from typing import Optional, Dict, List, Any
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
@@ -30,6 +31,9 @@ class PersistentMemory:
     def __init__(self, db_path: str = "support_memory.db"):
         self.db_path = db_path
         self.conn = None
+        # The connection is shared across threads (check_same_thread=False),
+        # so writes are serialized
+        self._lock = threading.RLock()
         self._init_db()
 
     def _init_db(self):
@@ -125,43 +129,44 @@ class PersistentMemory:
                     lead_score_history: List[int] = None,
                     user_id: Optional[str] = None) -> None:
         """Save or update a conversation session"""
-        now = datetime.now().isoformat()
-
-        # Check if session exists
-        existing = self.conn.execute(
-            "SELECT created_at FROM conversations WHERE session_id=?",
-            (session_id,)
-        ).fetchone()
-
-        if existing:
-            # Update existing
-            self.conn.execute("""
-                UPDATE conversations
-                SET messages=?, user_data=?, intent_history=?, sentiment_history=?,
-                    lead_score_history=?, last_updated=?, user_id=?
-                WHERE session_id=?
-            """, (
-                json.dumps(messages), json.dumps(user_data),
-                json.dumps(intent_history or []),
-                json.dumps(sentiment_history or []),
-                json.dumps(lead_score_history or []),
-                now, user_id, session_id
-            ))
-        else:
-            # Insert new
-            self.conn.execute("""
-                INSERT INTO conversations
-                (session_id, user_id, messages, user_data, intent_history,
-                 sentiment_history, lead_score_history, created_at, last_updated)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                session_id, user_id, json.dumps(messages),
-                json.dumps(user_data), json.dumps(intent_history or []),
-                json.dumps(sentiment_history or []),
-                json.dumps(lead_score_history or []), now, now
-            ))
-
-        self.conn.commit()
+        with self._lock:
+            now = datetime.now().isoformat()
+
+            # Check if session exists
+            existing = self.conn.execute(
+                "SELECT created_at FROM conversations WHERE session_id=?",
+                (session_id,)
+            ).fetchone()
+
+            if existing:
+                # Update existing
+                self.conn.execute("""
+                    UPDATE conversations
+                    SET messages=?, user_data=?, intent_history=?, sentiment_history=?,
+                        lead_score_history=?, last_updated=?, user_id=?
+                    WHERE session_id=?
+                """, (
+                    json.dumps(messages), json.dumps(user_data),
+                    json.dumps(intent_history or []),
+                    json.dumps(sentiment_history or []),
+                    json.dumps(lead_score_history or []),
+                    now, user_id, session_id
+                ))
+            else:
+                # Insert new
+                self.conn.execute("""
+                    INSERT INTO conversations
+                    (session_id, user_id, messages, user_data, intent_history,
+                     sentiment_history, lead_score_history, created_at, last_updated)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    session_id, user_id, json.dumps(messages),
+                    json.dumps(user_data), json.dumps(intent_history or []),
+                    json.dumps(sentiment_history or []),
+                    json.dumps(lead_score_history or []), now, now
+                ))
+
+            self.conn.commit()
 
     def load_session(self, session_id: str) -> Optional[UserSession]:
         """Load a conversation session"""
@@ -192,49 +197,68 @@ class PersistentMemory:
             return json.loads(row["messages"]) if row["messages"] else []
         return []
 
-    def update_user(self, user_id: Optional[str], **kwargs) -> None:
-        """Update or create user record"""
-        if not user_id:
-            return
+    def get_messages_for_sessions(self, session_ids: List[str],
+                                  tail: int = 5) -> Dict[str, List[Dict]]:
+        """Get the last `tail` messages for several sessions in one query"""
+        if not session_ids:
+            return {}
 
-        now = datetime.now().isoformat()
-        existing = self.conn.execute(
-            "SELECT * FROM users WHERE user_id=?", (user_id,)
-        ).fetchone()
+        placeholders = ", ".join("?" for _ in session_ids)
+        rows = self.conn.execute(f"""
+            SELECT session_id, messages FROM conversations
+            WHERE session_id IN ({placeholders})
+        """, list(session_ids)).fetchall()
 
-        if existing:
-            # Update
-            updates = []
-            values = []
-            for key, value in kwargs.items():
-                if value is not None:
-                    updates.append(f"{key}=?")
-                    values.append(value)
-
-            if updates:
-                values.append(now)
-                values.append(user_id)
-                query = f"UPDATE users SET {', '.join(updates)}, last_seen=? WHERE user_id=?"
-                self.conn.execute(query, values)
-
-                # Increment session count if it's a new session
-                self.conn.execute(
-                    "UPDATE users SET total_sessions=total_sessions+1 WHERE user_id=?",
-                    (user_id,)
-                )
-        else:
-            # Insert new
-            self.conn.execute("""
-                INSERT INTO users
-                (user_id, name, email, phone, company, first_seen, last_seen, properties)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                user_id, kwargs.get("name"), kwargs.get("email"),
-                kwargs.get("phone"), kwargs.get("company"), now, now,
-                json.dumps(kwargs.get("properties", {}))
-            ))
+        result = {session_id: [] for session_id in session_ids}
+        for row in rows:
+            messages = json.loads(row["messages"]) if row["messages"] else []
+            result[row["session_id"]] = messages[-tail:] if tail else messages
+        return result
 
-        self.conn.commit()
+    def update_user(self, user_id: Optional[str], **kwargs) -> None:
+        """Update or create user record"""
+        with self._lock:
+            if not user_id:
+                return
+
+            now = datetime.now().isoformat()
+            existing = self.conn.execute(
+                "SELECT * FROM users WHERE user_id=?", (user_id,)
+            ).fetchone()
+
+            if existing:
+                # Update
+                updates = []
+                values = []
+                for key, value in kwargs.items():
+                    if value is not None:
+                        updates.append(f"{key}=?")
+                        values.append(value)
+
+                if updates:
+                    values.append(now)
+                    values.append(user_id)
+                    query = f"UPDATE users SET {', '.join(updates)}, last_seen=? WHERE user_id=?"
+                    self.conn.execute(query, values)
+
+                    # Increment session count if it's a new session
+                    self.conn.execute(
+                        "UPDATE users SET total_sessions=total_sessions+1 WHERE user_id=?",
+                        (user_id,)
+                    )
+            else:
+                # Insert new
+                self.conn.execute("""
+                    INSERT INTO users
+                    (user_id, name, email, phone, company, first_seen, last_seen, properties)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    user_id, kwargs.get("name"), kwargs.get("email"),
+                    kwargs.get("phone"), kwargs.get("company"), now, now,
+                    json.dumps(kwargs.get("properties", {}))
+                ))
+
+            self.conn.commit()
 
     def get_user(self, user_id: str) -> Optional[Dict]:
         """Get user data"""
@@ -261,55 +285,67 @@ class PersistentMemory:
     def log_event(self, event_type: str, session_id: str,
                  user_id: Optional[str], data: Dict) -> None:
         """Log an event"""
-        self.conn.execute("""
-            INSERT INTO events (event_type, session_id, user_id, data, timestamp)
-            VALUES (?, ?, ?, ?, ?)
-        """, (event_type, session_id, user_id, json.dumps(data), datetime.now().isoformat()))
-        self.conn.commit()
+        with self._lock:
+            self.conn.execute("""
+                INSERT INTO events (event_type, session_id, user_id, data, timestamp)
+                VALUES (?, ?, ?, ?, ?)
+            """, (event_type, session_id, user_id, json.dumps(data), datetime.now().isoformat()))
+            self.conn.commit()
 
     def save_escalation(self, escalation_data: Dict) -> None:
         """Save escalation record"""
-        self.conn.execute("""
-            INSERT INTO escalations
-            (escalation_id, session_id, priority, reason, summary,
-             customer_issue, intent, sentiment, lead_score, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            escalation_data.get("escalation_id"),
-            escalation_data.get("session_id"),
-            escalation_data.get("priority"),
-            escalation_data.get("reason"),
-            escalation_data.get("summary"),
-            escalation_data.get("customer_issue"),
-            escalation_data.get("intent"),
-            escalation_data.get("sentiment"),
-            escalation_data.get("lead_score"),
-            datetime.now().isoformat()
-        ))
-        self.conn.commit()
+        with self._lock:
+            self.conn.execute("""
+                INSERT INTO escalations
+                (escalation_id, session_id, priority, reason, summary,
+                 customer_issue, intent, sentiment, lead_score, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                escalation_data.get("escalation_id"),
+                escalation_data.get("session_id"),
+                escalation_data.get("priority"),
+                escalation_data.get("reason"),
+                escalation_data.get("summary"),
+                escalation_data.get("customer_issue"),
+                escalation_data.get("intent"),
+                escalation_data.get("sentiment"),
+                escalation_data.get("lead_score"),
+                datetime.now().isoformat()
+            ))
+            self.conn.commit()
+
+    def resolve_escalations(self, escalation_ids: List[int]) -> None:
+        """Mark several escalations as resolved in a single transaction"""
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE escalations SET resolved=1 WHERE id=?",
+                [(escalation_id,) for escalation_id in escalation_ids]
+            )
+            self.conn.commit()
 
     def save_lead(self, lead_data: Dict) -> None:
         """Save lead record"""
-        self.conn.execute("""
-            INSERT INTO leads
-            (lead_id, session_id, user_id, lead_score, lead_stage,
-             name, email, phone, company, triggered_signals, interested_services, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            lead_data.get("lead_id"),
-            lead_data.get("session_id"),
-            lead_data.get("user_id"),
-            lead_data.get("lead_score"),
-            lead_data.get("lead_stage"),
-            lead_data.get("name"),
-            lead_data.get("email"),
-            lead_data.get("phone"),
-            lead_data.get("company"),
-            json.dumps(lead_data.get("triggered_signals", [])),
-            json.dumps(lead_data.get("interested_services", [])),
-            datetime.now().isoformat()
-        ))
-        self.conn.commit()
+        with self._lock:
+            self.conn.execute("""
+                INSERT INTO leads
+                (lead_id, session_id, user_id, lead_score, lead_stage,
+                 name, email, phone, company, triggered_signals, interested_services, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                lead_data.get("lead_id"),
+                lead_data.get("session_id"),
+                lead_data.get("user_id"),
+                lead_data.get("lead_score"),
+                lead_data.get("lead_stage"),
+                lead_data.get("name"),
+                lead_data.get("email"),
+                lead_data.get("phone"),
+                lead_data.get("company"),
+                json.dumps(lead_data.get("triggered_signals", [])),
+                json.dumps(lead_data.get("interested_services", [])),
+                datetime.now().isoformat()
+            ))
+            self.conn.commit()
 
     def get_metrics(self, days: int = 7) -> Dict[str, Any]:
         """Get metrics for the past N days"""
@@ -354,49 +390,108 @@ class PersistentMemory:
             "sentiment_distribution": [dict(r) for r in sentiments]
         }
 
-    def get_recent_conversations(self, limit: int = 20) -> List[Dict]:
-        """Get recent conversations"""
-        rows = self.conn.execute("""
+    def get_recent_conversations(self, limit: int = 20, offset: int = 0,
+                                 since: Optional[str] = None,
+                                 search: Optional[str] = None,
+                                 min_messages: int = 0) -> List[Dict]:
+        """Get recent conversations, optionally filtered and paginated"""
+        conditions = []
+        params: List[Any] = []
+        if since:
+            conditions.append("last_updated >= ?")
+            params.append(since)
+        if search:
+            # Match the search text literally, not as LIKE wildcards
+            escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append(
+                "(session_id LIKE ? ESCAPE '\\' "
+                "OR json_extract(user_data, '$.customer_name') LIKE ? ESCAPE '\\')"
+            )
+            params.extend([f"%{escaped}%", f"%{escaped}%"])
+        if min_messages:
+            conditions.append("json_array_length(messages) >= ?")
+            params.append(min_messages)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self.conn.execute(f"""
             SELECT session_id, user_id, created_at, last_updated,
                    json_extract(user_data, '$.customer_name') as name,
                    json_extract(user_data, '$.customer_email') as email
             FROM conversations
+            {where}
             ORDER BY last_updated DESC
-            LIMIT ?
-        """, (limit,)).fetchall()
+            LIMIT ? OFFSET ?
+        """, (*params, limit, offset)).fetchall()
 
         return [dict(row) for row in rows]
 
-    def get_recent_escalations(self, limit: int = 20) -> List[Dict]:
-        """Get recent escalations"""
-        rows = self.conn.execute("""
+    def get_recent_escalations(self, limit: int = 20, offset: int = 0,
+                               priorities: Optional[List[str]] = None) -> List[Dict]:
+        """Get recent escalations, optionally filtered by priority"""
+        where = ""
+        params: List[Any] = []
+        if priorities is not None:
+            if not priorities:
+                return []
+            where = f"WHERE priority IN ({', '.join('?' for _ in priorities)})"
+            params.extend(priorities)
+
+        rows = self.conn.execute(f"""
             SELECT * FROM escalations
+            {where}
             ORDER BY timestamp DESC
-            LIMIT ?
-        """, (limit,)).fetchall()
+            LIMIT ? OFFSET ?
+        """, (*params, limit, offset)).fetchall()
 
         return [dict(row) for row in rows]
 
-    def get_recent_leads(self, limit: int = 20) -> List[Dict]:
-        """Get recent leads"""
+    def get_escalation_rows(self, days: int = 30) -> List[Dict]:
+        """Get the columns used for escalation analytics over the past N days"""
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
         rows = self.conn.execute("""
-            SELECT * FROM leads
-            ORDER BY created_at DESC
-            LIMIT ?
-        """, (limit,)).fetchall()
+            SELECT priority, sentiment, lead_score
+            FROM escalations
+            WHERE timestamp > ?
+        """, (cutoff,)).fetchall()
 
         return [dict(row) for row in rows]
 
+    def get_recent_leads(self, limit: int = 20, offset: int = 0,
+                         min_score: Optional[int] = None) -> List[Dict]:
+        """Get recent leads (signal/service columns decoded to lists)"""
+        where = ""
+        params: List[Any] = []
+        if min_score is not None:
+            where = "WHERE lead_score >= ?"
+            params.append(min_score)
+
+        rows = self.conn.execute(f"""
+            SELECT * FROM leads
+            {where}
+            ORDER BY created_at DESC
+            LIMIT ? OFFSET ?
+        """, (*params, limit, offset)).fetchall()
+
+        leads = []
+        for row in rows:
+            lead = dict(row)
+            # Decode JSON list columns once here instead of in every caller
+            lead["triggered_signals"] = json.loads(row["triggered_signals"] or "[]")
+            lead["interested_services"] = json.loads(row["interested_services"] or "[]")
+            leads.append(lead)
+        return leads
+
     def cleanup_old_sessions(self, days: int = 30) -> int:
         """Remove sessions older than N days"""
-        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        with self._lock:
+            cutoff = (datetime.now() - timedelta(days=days)).isoformat()
 
-        cursor = self.conn.execute(
-            "DELETE FROM conversations WHERE last_updated < ?", (cutoff,)
-        )
-        self.conn.commit()
+            cursor = self.conn.execute(
+                "DELETE FROM conversations WHERE last_updated < ?", (cutoff,)
+            )
+            self.conn.commit()
 
-        return cursor.rowcount
+            return cursor.rowcount
 
     def close(self):
         """Close database connection"""
@@ -334,7 +334,8 @@ def handle_escalation_background(session_id: str, response: BotResponse):
                 "customer_name": session.memory.get("customer_name", {}).get("value"),
                 "customer_email": session.memory.get("customer_email", {}).get("value"),
                 "message_count": len(session.messages),
-                "messages": session.messages
+                "messages": session.messages,
+                "first_user_message": session.first_user_message
             },
             EscalationReason.TECHNICAL_ISSUE  # Determine from context
         )
@@ -11,6 +11,10 @@ import os
 import sys
 # import pytest  # Optional - only needed for pytest runner
 import json
+import smtplib
+import tempfile
+import threading
+from dataclasses import FrozenInstanceError, asdict
 from datetime import datetime
 from pathlib import Path
 
@@ -18,7 +22,10 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from bot import SupportStarterBot, BotConfig, create_bot
-from fault_reports import FaultReportSystem, UrgencyLevel, FaultCategory
+from fault_reports import FaultReport, FaultReportSystem, UrgencyLevel, FaultCategory, PENDING_REPORT_TIMEOUT_SECONDS
+from chat_logger import ChatLogger
+from persistent_memory import PersistentMemory
+from escalation import EscalationEngine, EscalationReason, EscalationStore
 
 
 class TestMultiTenantConfig:
@@ -94,6 +101,20 @@ class TestFaultReportSystem:
         category = self.fault_system.detect_category("Diskmaskinen läcker vatten")
         assert category == FaultCategory.WATER
 
+    def test_classify_batch_matches_single(self):
+        """Test batch classification agrees with the single-message detectors"""
+        messages = [
+            "Akut! Vattenläcka i köket, det forsar vatten överallt!",
+            "Det är ingen värme i lägenheten",
+            "Vad kostar en parkeringsplats?"
+        ]
+        expected = [
+            (self.fault_system.detect_urgency(m), self.fault_system.detect_category(m))
+            for m in messages
+        ]
+        assert self.fault_system.classify_batch(messages) == expected
+        assert expected[2] == (UrgencyLevel.LOW, FaultCategory.OTHER)
+
     def test_electrical_category_detection(self):
         """Test electrical category detection"""
         category = self.fault_system.detect_category("Det glimmar i lampan")
@@ -115,6 +136,271 @@ class TestFaultReportSystem:
         assert result["report"].urgency == UrgencyLevel.CRITICAL
         assert result["escalate_immediately"] is True
 
+    def test_generic_question_is_not_a_fault(self):
+        """Test messages without fault keywords get LOW urgency and OTHER category"""
+        result = self.fault_system.collect_fault_report(
+            "Vilka öppettider har kontoret?",
+            {"session_id": "test_generic"}
+        )
+        assert result["report"].urgency == UrgencyLevel.LOW
+        assert result["report"].category == FaultCategory.OTHER
+        assert result["escalate_immediately"] is False
+
+    def test_expired_pending_report_is_dropped(self):
+        """Test incomplete reports time out instead of accumulating"""
+        self.fault_system.collect_fault_report("Kranen droppar", {"session_id": "stale"})
+        self.fault_system.collect_fault_report("Elementet är kallt", {"session_id": "fresh"})
+        self.fault_system._pending_last_seen["stale"] -= PENDING_REPORT_TIMEOUT_SECONDS + 1
+
+        assert self.fault_system.cleanup_expired_reports() == 1
+        assert list(self.fault_system.pending_reports) == ["fresh"]
+
+
+class FakeSMTP:
+    """Stand-in for smtplib.SMTP that records connections and commands"""
+    instances = []
+    disconnect_next = False
+
+    def __init__(self, host, port):
+        self.calls = []
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        self.calls.append("starttls")
+
+    def login(self, user, password):
+        self.calls.append("login")
+
+    def send_message(self, msg):
+        if FakeSMTP.disconnect_next:
+            FakeSMTP.disconnect_next = False
+            raise smtplib.SMTPServerDisconnected("idle timeout")
+        self.calls.append("send")
+
+    def quit(self):
+        self.calls.append("quit")
+
+    def close(self):
+        self.calls.append("close")
+
+
+class TestFaultReportDelivery:
+    """Test background report delivery over a reused SMTP connection"""
+
+    def setup_method(self):
+        """Setup fault system with SMTP configured and smtplib stubbed"""
+        self.real_smtp = smtplib.SMTP
+        smtplib.SMTP = FakeSMTP
+        FakeSMTP.instances = []
+        FakeSMTP.disconnect_next = False
+
+        self.fault_system = FaultReportSystem()
+        self.fault_system.smtp_host = "smtp.example.com"
+        self.fault_system.smtp_user = "bot@example.com"
+        self.fault_system.smtp_pass = "secret"
+        self.fault_system.admin_email = "jour@example.com"
+        self.report = FaultReport("fault_1", "smtp_test", FaultCategory.WATER, UrgencyLevel.HIGH, "Läcker under diskbänken")
+
+    def teardown_method(self):
+        """Restore smtplib"""
+        self.fault_system.close()
+        smtplib.SMTP = self.real_smtp
+
+    def test_connection_is_reused(self):
+        """Test reports share one connection, reconnect once dropped and quit on close"""
+        assert self.fault_system._send_report_email(self.report) is True
+        assert self.fault_system._send_report_email(self.report) is True
+        assert len(FakeSMTP.instances) == 1
+        assert FakeSMTP.instances[0].calls == ["starttls", "login", "send", "send"]
+
+        FakeSMTP.disconnect_next = True
+        assert self.fault_system._send_report_email(self.report) is True
+        assert len(FakeSMTP.instances) == 2
+        assert FakeSMTP.instances[0].calls[-1] == "quit"
+        assert FakeSMTP.instances[1].calls == ["starttls", "login", "send"]
+
+        self.fault_system.close()
+        assert FakeSMTP.instances[1].calls[-1] == "quit"
+        assert self.fault_system._smtp is None
+
+    def test_delivery_runs_in_background(self):
+        """Test reports are sent after collect returns, as snapshots, and close drains them"""
+        release = threading.Event()
+        sent = []
+
+        def send_report_email(report):
+            release.wait(timeout=5)
+            sent.append(report)
+            return True
+
+        self.fault_system._send_report_email = send_report_email
+        message = "Akut! Vattenläcka i köket, det forsar vatten överallt!"
+        result = self.fault_system.collect_fault_report(message, {"session_id": "async_test"})
+        assert result["escalate_immediately"] is True
+        assert sent == []
+
+        # A follow-up changes the pending report after the email was queued
+        self.fault_system.collect_fault_report("Det rinner ner till grannen", {"session_id": "async_test"})
+        assert "Tilläggsinfo" in self.fault_system.pending_reports["async_test"].description
+
+        release.set()
+        self.fault_system.close()
+        assert len(sent) == 1
+        assert sent[0].description == message
+        assert sent[0] is not self.fault_system.pending_reports["async_test"]
+
+
+class TestChatLogger:
+    """Test conversation log persistence"""
+
+    def setup_method(self):
+        """Setup logger in a temporary directory"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_dir = self.tmp_dir.name
+        self.logger = ChatLogger(self.log_dir)
+
+    def teardown_method(self):
+        """Remove the temporary log directory"""
+        self.tmp_dir.cleanup()
+
+    def test_saved_conversation_roundtrip(self):
+        """Test ended conversation can be loaded back from disk"""
+        self.logger.log_message("log_1", "user", "Hej, vattenläcka i köket!")
+        self.logger.log_message("log_1", "assistant", "Stäng av vattnet", urgency="critical")
+        self.logger.end_conversation("log_1")
+
+        conv = self.logger.get_conversation("log_1")
+        assert conv is not None
+        assert len(conv.messages) == 2
+        assert conv.messages[0].content == "Hej, vattenläcka i köket!"
+        assert conv.escalated is True
+        assert not list(Path(self.log_dir, "sessions").glob("*.tmp"))
+
+    def test_corrupt_session_falls_back_to_daily_log(self):
+        """Test truncated session file is recovered from daily log"""
+        self.logger.log_message("log_2", "user", "Det är kallt i lägenheten")
+        self.logger.end_conversation("log_2")
+
+        session_path = Path(self.log_dir, "sessions", "log_2.json")
+        session_path.write_text('{"session_id": "log_2", "mess', encoding="utf-8")
+
+        conv = self.logger.get_conversation("log_2")
+        assert conv is not None
+        assert conv.messages[0].content == "Det är kallt i lägenheten"
+
+
+class TestPersistentMemory:
+    """Test SQLite-backed session storage"""
+
+    def setup_method(self):
+        """Setup in-memory database"""
+        self.db = PersistentMemory(":memory:")
+
+    def test_messages_for_sessions_batch(self):
+        """Test batch message lookup returns the tail for each session"""
+        messages = [{"role": "user", "content": f"msg {i}"} for i in range(8)]
+        self.db.save_session("batch_1", messages, {})
+        self.db.save_session("batch_2", messages[:2], {})
+
+        result = self.db.get_messages_for_sessions(["batch_1", "batch_2", "missing"], tail=5)
+        assert [m["content"] for m in result["batch_1"]] == [f"msg {i}" for i in range(3, 8)]
+        assert len(result["batch_2"]) == 2
+        assert result["missing"] == []
+
+    def test_search_is_literal(self):
+        """Test LIKE wildcards in a search only match themselves"""
+        self.db.save_session("web_1", [], {})
+        self.db.save_session("webX1", [], {})
+
+        found = self.db.get_recent_conversations(search="b_1")
+        assert [row["session_id"] for row in found] == ["web_1"]
+        assert self.db.get_recent_conversations(search="%") == []
+
+
+class TestEscalationStore:
+    """Test column-oriented escalation analytics"""
+
+    def test_aggregates(self):
+        """Test priority counts and mean lead score"""
+        store = EscalationStore.from_records([
+            {"escalation_id": "esc_1", "priority": "high", "sentiment": "angry", "lead_score": 2},
+            {"escalation_id": "esc_2", "priority": "critical", "sentiment": "angry", "lead_score": 5},
+            {"escalation_id": "esc_3", "priority": "high", "sentiment": "neutral", "lead_score": 2},
+        ])
+        assert len(store) == 3
+        assert store.counts_by_priority() == {"low": 0, "medium": 0, "high": 2, "critical": 1}
+        assert store.counts_by_sentiment() == {"angry": 2, "neutral": 1}
+        assert store.mean_lead_score() == 3.0
+
+    def test_unknown_priority_is_not_low(self):
+        """Test rows with a missing or unrecognised priority get their own bucket"""
+        store = EscalationStore.from_records([
+            {"priority": "low", "sentiment": "neutral", "lead_score": 1},
+            {"priority": None, "sentiment": "neutral", "lead_score": 1},
+            {"priority": "urgent", "sentiment": "angry", "lead_score": 1},
+        ])
+        assert store.counts_by_priority() == {"low": 1, "medium": 0, "high": 0, "critical": 0, "unknown": 2}
+
+    def test_empty_store(self):
+        """Test aggregates on an empty store"""
+        store = EscalationStore()
+        assert sum(store.counts_by_priority().values()) == 0
+        assert store.mean_lead_score() == 0.0
+
+
+class TestEscalationEngine:
+    """Test escalation decisions"""
+
+    def setup_method(self):
+        """Setup escalation engine"""
+        self.engine = EscalationEngine()
+
+    def test_batch_matches_single(self):
+        """Test batch evaluation gives the same decisions as single calls"""
+        cases = [
+            {"intent": "pricing_question", "sentiment": "neutral", "lead_score": 3,
+             "conversation_turns": 2, "message": "Vad kostar det?"},
+            {"intent": "general", "sentiment": "neutral", "lead_score": 1,
+             "conversation_turns": 1, "message": "Jag kontaktar min advokat"},
+            {"intent": "refund_request", "sentiment": "frustrated", "lead_score": 1,
+             "conversation_turns": 3, "message": "Jag vill ha pengarna tillbaka"},
+        ]
+        decisions = self.engine.should_escalate_batch(cases)
+        assert decisions == [
+            (False, None),
+            (True, EscalationReason.LEGAL_THREAT),
+            (True, EscalationReason.ANGRY_CUSTOMER),
+        ]
+        for case, decision in zip(cases, decisions):
+            assert self.engine.should_escalate(**case) == decision
+
+    def test_keyword_triggers(self):
+        """Test keywords match in any case and legal outranks other groups"""
+        def decide(message):
+            return self.engine.should_escalate("general", "neutral", 1, 1, message)
+
+        assert decide("Kan jag prata med din CHEF?") == (True, EscalationReason.MANAGER_REQUEST)
+        assert decide("Ett Faktureringsfel på min räkning") == (True, EscalationReason.BILLING_ERROR)
+        assert decide("Chefen får höra från min advokat") == (True, EscalationReason.LEGAL_THREAT)
+        assert decide("Hur bokar jag en visning?") == (False, None)
+
+    def test_packet_is_immutable(self):
+        """Test escalation packets are frozen and hashable"""
+        packet = self.engine.create_escalation_packet(
+            {"conversation_id": "conv_1", "objections": ["För dyrt"]},
+            EscalationReason.BILLING_ERROR
+        )
+        assert packet.objections == ("För dyrt",)
+        assert len({packet, packet}) == 1
+        try:
+            packet.lead_score = 10
+            assert False, "EscalationContext should be frozen"
+        except FrozenInstanceError:
+            pass
+        assert json.loads(packet.to_json()) == json.loads(json.dumps(packet.to_dict()))
+        assert asdict(packet)["objections"] == ("För dyrt",)
+        assert json.loads(packet.to_json())["objections"] == ["För dyrt"]
+
 
 class TestBotMessageProcessing:
     """Test bot message processing"""
@@ -247,6 +533,11 @@ if __name__ == "__main__":
     test_classes = [
         ("Multi-Tenant Config", TestMultiTenantConfig),
         ("Fault Report System", TestFaultReportSystem),
+        ("Fault Report Delivery", TestFaultReportDelivery),
+        ("Chat Logger", TestChatLogger),
+        ("Persistent Memory", TestPersistentMemory),
+        ("Escalation Store", TestEscalationStore),
+        ("Escalation Engine", TestEscalationEngine),
         ("Bot Message Processing", TestBotMessageProcessing),
         ("Local Model Fallback", TestLocalModelFallback),
     ]
@@ -270,7 +561,11 @@ if __name__ == "__main__":
                     instance.setup_method()
 
                 # Run test
-                getattr(instance, method_name)()
+                try:
+                    getattr(instance, method_name)()
+                finally:
+                    if hasattr(instance, "teardown_method"):
+                        instance.teardown_method()
                 print(f"  ✓ {method_name}")
                 results["passed"] += 1
 
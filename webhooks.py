@@ -522,7 +522,7 @@ if __name__ == "__main__":
     )
 
     print("\n--- Test Data Created ---")
-    print("Escalation:", test_escalation.to_json()[:200] + "...")
+    print("Escalation:", test_escalation.to_json(pretty=True)[:200] + "...")
     print("Lead:", test_lead.to_json()[:200] + "...")
 
     print("\n--- Configure from environment ---")